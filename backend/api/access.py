@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db.models import BooleanField, Value
+
+from .caching import PROJECT_ACCESS_KEY, PROJECT_ACCESS_TIMEOUT
+from .models import Profile, Project, TeamMember
+
+
+class ProjectAccess:
+    """The IDs of the projects a user owns or is a team member of."""
+
+    def __init__(self, owned=(), accessible=()):
+        self.owned = frozenset(owned)
+        self.accessible = frozenset(accessible) | self.owned
+
+    @classmethod
+    def load(cls, user):
+        """
+        Reads the user's access index from the cache, falling back to SQL on
+        a miss. Entries are only used while they match the user's
+        Profile.access_version, which model signals bump whenever membership
+        changes, so a per-process cache never serves access another worker
+        has revoked.
+        """
+        if not user or not user.is_authenticated:
+            return cls()
+        key = PROJECT_ACCESS_KEY.format(user.id)
+        version = Profile.objects.filter(user_id=user.id).values_list('access_version', flat=True).first()
+        cached = cache.get(key)
+        if cached is not None and version is not None and cached[0] == version:
+            return cls(*cached[1:])
+        access = cls.load_from_db(user)
+        if version is not None:
+            cache.set(key, (version, access.owned, access.accessible), PROJECT_ACCESS_TIMEOUT)
+        return access
+
+    @classmethod
+    def load_from_db(cls, user):
+        # One UNION query returns (project_id, is_owner) rows for both sources.
+        rows = Project.objects.filter(owner=user).values_list(
+            'id', Value(True, output_field=BooleanField())
+        ).union(
+            TeamMember.objects.filter(user=user).values_list(
+                'project_id', Value(False, output_field=BooleanField())
+            )
+        )
+        owned, accessible = set(), set()
+        for project_id, is_owner in rows:
+            accessible.add(project_id)
+            if is_owner:
+                owned.add(project_id)
+        return cls(owned, accessible)
+
+    def can_access(self, project_id):
+        return project_id in self.accessible
+
+    def owns(self, project_id):
+        return project_id in self.owned
+
+    def filter(self, queryset, field='project_id'):
+        """Restricts ``queryset`` to rows whose ``field`` is an accessible project."""
+        return queryset.filter(**{f'{field}__in': self.accessible})
+
+
+def get_project_access(request):
+    """Returns the request user's ProjectAccess, loading it at most once per request."""
+    # DRF wraps the Django request; cache on the inner one so both share it.
+    http_request = getattr(request, '_request', request)
+    access = getattr(http_request, '_project_access', None)
+    if access is None:
+        access = ProjectAccess.load(request.user)
+        http_request._project_access = access
+    return access
@@ -2,7 +2,8 @@ from django.contrib import admin
 from .models import (
     Project, Task, TeamMember, Comment, 
     Attachment, ActivityLog, Notification, 
-    Expense, Profile
+    Expense, Profile, ProjectStats, UploadSession, AttachmentBlob,
+    render_activity,
 )
 
 @admin.register(Project)
@@ -37,14 +38,31 @@ class ExpenseAdmin(admin.ModelAdmin):
 
 @admin.register(ActivityLog)
 class ActivityLogAdmin(admin.ModelAdmin):
-    list_display = ('user', 'action', 'project', 'timestamp')
-    list_filter = ('timestamp',)
+    list_display = ('user', 'text', 'project', 'timestamp')
+    list_filter = ('event_type', 'timestamp')
+    list_select_related = ('user', 'target_user', 'project')
     readonly_fields = ('timestamp',)
 
+    @admin.display(description='Action')
+    def text(self, obj):
+        return render_activity(obj)
+
 @admin.register(Profile)
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'role', 'course')
 
+@admin.register(ProjectStats)
+class ProjectStatsAdmin(admin.ModelAdmin):
+    list_display = ('project', 'total_tasks', 'done_tasks', 'expense_total', 'member_count', 'last_activity_at')
+
+@admin.register(AttachmentBlob)
+class AttachmentBlobAdmin(admin.ModelAdmin):
+    list_display = ('sha256', 'size', 'content_type', 'ref_count', 'created_at')
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'task', 'uploaded_by', 'received', 'size', 'updated_at')
+
 admin.site.register(Comment)
 admin.site.register(Attachment)
 admin.site.register(Notification)
\ No newline at end of file
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.db import transaction
+
+# Cached responses are keyed on a per-user version number. Signals bump the
+# version instead of deleting keys, so stale snapshots simply stop being read.
+DASHBOARD_VERSION_KEY = 'dashboard-stats-version:{}'
+DASHBOARD_SNAPSHOT_KEY = 'dashboard-stats:{}:v{}'
+DASHBOARD_SNAPSHOT_TIMEOUT = 60 * 15
+
+# Owned/member project IDs per user, tagged with the Profile.access_version
+# they were built at; see api.access.ProjectAccess.
+PROJECT_ACCESS_KEY = 'project-access:{}'
+PROJECT_ACCESS_TIMEOUT = 60 * 60
+
+
+def get_dashboard_cache_key(user_id):
+    version = cache.get_or_set(DASHBOARD_VERSION_KEY.format(user_id), 1, timeout=None)
+    return DASHBOARD_SNAPSHOT_KEY.format(user_id, version)
+
+
+def _bump_dashboard_versions(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def invalidate_dashboards(user_ids):
+    """
+    Bumps the users' dashboard versions now and again once the current
+    transaction commits, so a snapshot cached by a concurrent request from
+    pre-commit data is not served afterwards.
+    """
+    keys = [DASHBOARD_VERSION_KEY.format(user_id) for user_id in set(user_ids) if user_id is not None]
+    if keys:
+        _bump_dashboard_versions(keys)
+        transaction.on_commit(lambda: _bump_dashboard_versions(keys))
+
+
+def invalidate_project_dashboards(project_ids):
+    """Invalidates the dashboard of every owner and member of the given projects."""
+    from .models import Project, TeamMember
+
+    project_ids = [project_id for project_id in set(project_ids) if project_id is not None]
+    if not project_ids:
+        return
+    user_ids = list(Project.objects.filter(id__in=project_ids).values_list('owner_id', flat=True))
+    user_ids += TeamMember.objects.filter(project_id__in=project_ids).values_list('user_id', flat=True)
+    invalidate_dashboards(user_ids)
+
+
+def invalidate_project_access(user_ids):
+    """
+    Bumps the users' access versions in the database, which every cached
+    access index is checked against, so the change reaches all workers once
+    the transaction commits. The local entries are dropped as well.
+    """
+    from .models import Profile
+
+    user_ids = [user_id for user_id in set(user_ids) if user_id is not None]
+    if user_ids:
+        Profile.bump_access_version(user_ids)
+        cache.delete_many([PROJECT_ACCESS_KEY.format(user_id) for user_id in user_ids])
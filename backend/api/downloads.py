@@ -0,0 +1,141 @@
+import re
+import time
+from urllib.parse import quote, urlencode
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.crypto import constant_time_compare, salted_hmac
+from django.utils.http import content_disposition_header, parse_etags
+
+SIGNING_SALT = 'api.downloads'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+READ_SIZE = 64 * 1024
+
+
+# -----------------------
+# SIGNED URLS
+# -----------------------
+
+def _signed_query(name, expires, filename, content_type):
+    query = urlencode({'exp': expires, 'fn': filename, 'ct': content_type})
+    signature = salted_hmac(SIGNING_SALT, f'{name}?{query}', algorithm='sha256').hexdigest()
+    return query, signature
+
+
+def signing_window(now=None):
+    """
+    The index of the current ATTACHMENT_URL_TTL-long window. URLs signed
+    within one window are identical, so browsers and proxies can cache them.
+    """
+    return int(time.time() if now is None else now) // settings.ATTACHMENT_URL_TTL
+
+
+def sign_file_url(name, filename, content_type):
+    """
+    Returns a media URL for the stored file ``name``. It expires at the end
+    of the window after the current one, so it stays valid for between one
+    and two ATTACHMENT_URL_TTLs. Everything needed to serve it travels in
+    the signed query string, so checking it takes no database access.
+    """
+    expires = (signing_window() + 2) * settings.ATTACHMENT_URL_TTL
+    query, signature = _signed_query(name, expires, filename, content_type)
+    return f"{settings.MEDIA_URL}{quote(name)}?{query}&sig={signature}"
+
+
+def verify_signed_request(name, params):
+    """Returns (filename, content_type) for a valid, unexpired signature, else None."""
+    try:
+        expires = int(params['exp'])
+    except (KeyError, ValueError):
+        return None
+    if expires < time.time():
+        return None
+    filename, content_type = params.get('fn', ''), params.get('ct', '')
+    _, signature = _signed_query(name, expires, filename, content_type)
+    if not constant_time_compare(signature, params.get('sig', '')):
+        return None
+    return filename, content_type or 'application/octet-stream'
+
+
+# -----------------------
+# RESPONSES
+# -----------------------
+
+def parse_range(header, size):
+    """
+    Returns the (start, end) byte span of a single ``bytes=`` range, None
+    when the whole file should be sent, or False when it is unsatisfiable.
+    """
+    match = RANGE_RE.match(header or '')
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or int(last) == 0:
+            return False
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def _read_span(fh, start, length):
+    try:
+        fh.seek(start)
+        while length > 0:
+            data = fh.read(min(READ_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        fh.close()
+
+
+def serve_file(request, name, filename, content_type, etag, cache_control):
+    """
+    Answers conditional and Range requests for a stored file. When a front
+    proxy is configured the transfer is handed to it with X-Accel-Redirect
+    or X-Sendfile; otherwise the bytes are streamed from storage.
+    """
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    elif settings.SENDFILE_BACKEND == 'nginx':
+        # nginx handles Range and If-Range itself for internal redirects.
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = f"{settings.SENDFILE_URL_PREFIX}{quote(name)}"
+    elif settings.SENDFILE_BACKEND == 'sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = default_storage.path(name)
+    else:
+        response = _stream_file(request, name, content_type, etag)
+
+    response['ETag'] = etag
+    response['Cache-Control'] = cache_control
+    response['Accept-Ranges'] = 'bytes'
+    if filename and response.status_code != 304:
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    return response
+
+
+def _stream_file(request, name, content_type, etag):
+    size = default_storage.size(name)
+    if_range = request.headers.get('If-Range')
+    span = parse_range(request.headers.get('Range'), size) if if_range in (None, etag) else None
+
+    if span is False:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+    fh = default_storage.open(name, 'rb')
+    if span is None:
+        return FileResponse(fh, content_type=content_type)
+
+    start, end = span
+    response = StreamingHttpResponse(_read_span(fh, start, end - start + 1), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(end - start + 1)
+    return response
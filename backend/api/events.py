@@ -0,0 +1,48 @@
+import asyncio
+import threading
+from collections import defaultdict
+
+
+class NotificationBroker:
+    """
+    In-process pub/sub that wakes the open notification streams of the same
+    worker process when their user is notified. Streams read what to send
+    from the database, so a missed or dropped wake-up only delays delivery.
+    """
+    QUEUE_SIZE = 100
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = defaultdict(set)
+
+    def subscribe(self, user_id):
+        """Registers a stream for ``user_id``; must be called from its event loop."""
+        subscription = (asyncio.get_running_loop(), asyncio.Queue(maxsize=self.QUEUE_SIZE))
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, user_id, subscription):
+        with self._lock:
+            self._subscribers[user_id].discard(subscription)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    def publish(self, notifications):
+        """Queues notifications for their recipients' streams. Safe to call from any thread."""
+        for notification in notifications:
+            with self._lock:
+                subscriptions = list(self._subscribers.get(notification.user_id, ()))
+            for loop, queue in subscriptions:
+                loop.call_soon_threadsafe(self._offer, queue, notification)
+
+    @staticmethod
+    def _offer(queue, notification):
+        try:
+            queue.put_nowait(notification)
+        except asyncio.QueueFull:
+            # The stream is already due to re-read from the database.
+            pass
+
+
+notification_broker = NotificationBroker()
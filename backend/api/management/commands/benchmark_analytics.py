@@ -0,0 +1,116 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.caching import get_dashboard_cache_key, invalidate_dashboards, invalidate_project_access
+from api.models import ActivityLog, ActivityRollup, ActivityType, Expense, Project, Task, TeamMember
+from api.views import ActivityLogViewSet, AnalyticsView, DashboardStatsView, ExpenseViewSet, TaskViewSet
+
+
+class UnpaginatedActivityLogViewSet(ActivityLogViewSet):
+    """The activity log list as it was served then: every log, newest first."""
+    pagination_class = None
+
+    def get_queryset(self):
+        return super().get_queryset().order_by('-timestamp')
+
+
+# The three lists the analytics page used to download and reduce in the
+# browser, with the payloads they had then: the whole activity log, and
+# tasks with their assignees and attachments embedded.
+CLIENT_SIDE_REQUESTS = [
+    ('/api/expenses/', ExpenseViewSet.as_view({'get': 'list'})),
+    ('/api/activity-logs/', UnpaginatedActivityLogViewSet.as_view({'get': 'list'})),
+    ('/api/tasks/?expand=assigned_to_details,attachments', TaskViewSet.as_view({'get': 'list'})),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the analytics endpoint with the three list requests it "
+        "replaced, and cold with warm dashboard stats, on a generated account "
+        "that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--projects', type=int, default=20, help='Projects in the account.')
+        parser.add_argument('--rows', type=int, default=1000, help='Tasks, expenses and logs per project.')
+        parser.add_argument('--requests', type=int, default=10, help='Timed requests per mode.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.populate(options['projects'], options['rows'])
+            runs = range(options['requests'])
+            results = {
+                'client side': [self.time_requests(user, CLIENT_SIDE_REQUESTS) for _ in runs],
+                'analytics': [self.time_requests(user, [('/api/analytics/', AnalyticsView.as_view())]) for _ in runs],
+                'dashboard cold': [self.time_dashboard(user, cold=True) for _ in runs],
+                'dashboard warm': [self.time_dashboard(user, cold=False) for _ in runs],
+            }
+            transaction.set_rollback(True)
+        # The rollback frees the user id, so drop what was cached under it.
+        invalidate_dashboards([user.id])
+        invalidate_project_access([user.id])
+
+        self.stdout.write(f"{options['projects']} projects with {options['rows']} tasks, expenses and logs each.")
+        for mode, timings in results.items():
+            size = timings[0][1]
+            timings = sorted(ms for ms, _ in timings)
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            self.stdout.write(
+                f"{mode:>14}: {size} bytes, median {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms"
+            )
+
+    def populate(self, n_projects, n_rows):
+        user = User.objects.create_user('benchmark-analytics')
+        projects = Project.objects.bulk_create([
+            Project(owner=user, title=f'Benchmark {i}') for i in range(n_projects)
+        ])
+        TeamMember.objects.bulk_create([TeamMember(project=p, user=user, role='Owner') for p in projects])
+        now = timezone.now()
+        for project in projects:
+            Task.objects.bulk_create([
+                Task(project=project, title=f'Task {i}', status='Done' if i % 3 == 0 else 'Pending')
+                for i in range(n_rows)
+            ])
+            Expense.objects.bulk_create([
+                Expense(project=project, description=f'Expense {i}', amount=10, category=f'Category {i % 5}')
+                for i in range(n_rows)
+            ])
+            logs = ActivityLog.objects.bulk_create([
+                ActivityLog(project=project, user=user, event_type=ActivityType.OTHER, action=f'Event {i}')
+                for i in range(n_rows)
+            ])
+            # auto_now_add stamps every row with now, so spread them over the
+            # week afterwards and build the rollup from the final timestamps.
+            for days in range(7):
+                spread = logs[days::7]
+                ActivityLog.objects.filter(id__in=[log.id for log in spread]).update(timestamp=now - timedelta(days=days))
+                for log in spread:
+                    log.timestamp = now - timedelta(days=days)
+            ActivityRollup.record(logs)
+        return user
+
+    def time_requests(self, user, requests):
+        """Returns the milliseconds and response bytes of one page load."""
+        started = time.perf_counter()
+        size = 0
+        for path, view in requests:
+            request = APIRequestFactory().get(path)
+            force_authenticate(request, user=user)
+            response = view(request)
+            response.render()
+            size += len(response.content)
+        return (time.perf_counter() - started) * 1000, size
+
+    def time_dashboard(self, user, cold):
+        if cold:
+            cache.delete(get_dashboard_cache_key(user.id))
+        return self.time_requests(user, [('/api/dashboard-stats/', DashboardStatsView.as_view())])
@@ -0,0 +1,111 @@
+import random
+import statistics
+import string
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.access import ProjectAccess
+from api.caching import invalidate_project_access
+from api.models import Project, SearchDocument, TeamMember
+from api.search import _search_without_index, search_terms
+from api.views import SearchView
+
+# Share of documents each searched word is added to; the rest of the text is
+# drawn from a large vocabulary of generated words that queries never hit.
+SEARCHED_WORDS = {
+    'design': 0.05,
+    'presentation': 0.01,
+    'budget': 0.02,
+    'report': 0.02,
+    'calibration': 0.0001,
+}
+FILLER_WORDS = 20_000
+
+# (label, query): a frequent word, a prefix, two words together and a rare word.
+QUERIES = [
+    ('common word', 'design'),
+    ('prefix', 'pres'),
+    ('two words', 'budget report'),
+    ('rare word', 'calibration'),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the ranked search endpoint against the unindexed scan used on "
+        "backends without a full-text index, on generated documents that are "
+        "rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=1_000_000, help='Search documents in the table.')
+        parser.add_argument('--projects', type=int, default=100, help='Projects the documents are spread over.')
+        parser.add_argument('--requests', type=int, default=5, help='Timed requests per query and mode.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = self.populate(options['documents'], options['projects'])
+            project_ids = ProjectAccess.load_from_db(user).accessible
+            results = {}
+            for label, query in QUERIES:
+                runs = range(options['requests'])
+                results[label] = {
+                    'indexed': [self.time_request(user, query) for _ in runs],
+                    'scan': [self.time_scan(query, project_ids) for _ in runs],
+                }
+            transaction.set_rollback(True)
+        # The rollback frees the user id, so drop what was cached under it.
+        invalidate_project_access([user.id])
+
+        self.stdout.write(f"{options['documents']} documents over {options['projects']} projects.")
+        for label, modes in results.items():
+            for mode, timings in modes.items():
+                timings.sort()
+                p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+                self.stdout.write(
+                    f"{label:>11} {mode:>7}: median {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms"
+                )
+
+    def populate(self, n_documents, n_projects):
+        user = User.objects.create_user('benchmark-search')
+        projects = Project.objects.bulk_create([
+            Project(owner=user, title=f'Benchmark {i}') for i in range(n_projects)
+        ])
+        TeamMember.objects.bulk_create([TeamMember(project=p, user=user, role='Owner') for p in projects])
+        # Start above existing rows so the (kind, object_id) keys stay unique.
+        first_id = (SearchDocument.objects.order_by('-object_id').values_list('object_id', flat=True).first() or 0) + 1
+        rng = random.Random(0)
+        filler = [
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(FILLER_WORDS)
+        ]
+        batch = []
+        for i in range(n_documents):
+            words = rng.choices(filler, k=8)
+            words += [word for word, share in SEARCHED_WORDS.items() if rng.random() < share]
+            rng.shuffle(words)
+            batch.append(SearchDocument(
+                kind='comment', object_id=first_id + i, project=projects[i % n_projects],
+                title=' '.join(words[:3]).capitalize(), body=' '.join(words[3:]),
+            ))
+            if len(batch) == 5000:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+        return user
+
+    def time_request(self, user, query):
+        request = APIRequestFactory().get('/api/search/', {'q': query})
+        force_authenticate(request, user=user)
+        started = time.perf_counter()
+        response = SearchView.as_view()(request)
+        response.render()
+        return (time.perf_counter() - started) * 1000
+
+    def time_scan(self, query, project_ids):
+        started = time.perf_counter()
+        _search_without_index(search_terms(query), project_ids, SearchView.DEFAULT_LIMIT)
+        return (time.perf_counter() - started) * 1000
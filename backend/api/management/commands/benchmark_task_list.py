@@ -0,0 +1,79 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.caching import invalidate_project_access
+from api.models import Project, Task, TeamMember
+from api.views import TaskViewSet
+
+from .mark_missed_tasks import OPEN_STATUSES
+
+
+class Command(BaseCommand):
+    help = (
+        "Times the task list endpoint with and without the overdue sweep the "
+        "read path used to run, on a generated table that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100_000, help='Tasks in the table.')
+        parser.add_argument('--projects', type=int, default=100, help='Projects the tasks are spread over.')
+        parser.add_argument('--requests', type=int, default=20, help='Timed requests per mode.')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            project = self.populate(options['tasks'], options['projects'])
+            first = self.time_request(project, inline_sweep=True)
+            results = {
+                'inline sweep': [self.time_request(project, inline_sweep=True) for _ in range(options['requests'])],
+                'no sweep': [self.time_request(project, inline_sweep=False) for _ in range(options['requests'])],
+            }
+            transaction.set_rollback(True)
+        # The rollback frees the user id, so drop what was cached under it.
+        invalidate_project_access([self.user.id])
+
+        self.stdout.write(f"{options['tasks']} tasks, {options['tasks'] // options['projects']} listed per request.")
+        self.stdout.write(f"First request with inline sweep (marks the overdue backlog): {first:.1f} ms")
+        for mode, timings in results.items():
+            timings.sort()
+            p95 = timings[max(0, int(len(timings) * 0.95) - 1)]
+            self.stdout.write(f"{mode:>13}: median {statistics.median(timings):.1f} ms, p95 {p95:.1f} ms")
+
+    def populate(self, n_tasks, n_projects):
+        user = User.objects.create_user('benchmark-task-list')
+        projects = Project.objects.bulk_create([
+            Project(owner=user, title=f'Benchmark {i}') for i in range(n_projects)
+        ])
+        TeamMember.objects.bulk_create([TeamMember(project=p, user=user, role='Owner') for p in projects])
+        overdue = timezone.now().date() - timedelta(days=1)
+        batch = []
+        for i in range(n_tasks):
+            # One task in ten is open and overdue, for the sweep to find.
+            batch.append(Task(
+                project=projects[i % n_projects], title=f'Task {i}',
+                status='Pending' if i % 10 == 0 else 'Done', due_date=overdue,
+            ))
+            if len(batch) == 5000:
+                Task.objects.bulk_create(batch)
+                batch = []
+        Task.objects.bulk_create(batch)
+        self.user = user
+        return projects[0]
+
+    def time_request(self, project, inline_sweep):
+        request = APIRequestFactory().get('/api/tasks/', {'project': project.id})
+        force_authenticate(request, user=self.user)
+        started = time.perf_counter()
+        if inline_sweep:
+            Task.objects.filter(
+                due_date__lt=timezone.now().date(), status__in=OPEN_STATUSES,
+            ).update(status='Missed')
+        response = TaskViewSet.as_view({'get': 'list'})(request)
+        response.render()
+        return (time.perf_counter() - started) * 1000
@@ -0,0 +1,151 @@
+import os
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef
+from django.utils import timezone
+
+from api.models import Attachment, AttachmentBlob
+
+LEGACY_DIR = 'attachments'
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves pre-deduplication attachments into content-addressed blobs and "
+        "reclaims blobs and legacy files that nothing references, in batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=200,
+            help='Number of rows handled per transaction.',
+        )
+        parser.add_argument(
+            '--grace-hours', type=int, default=24,
+            help='Leave unreferenced blobs and files younger than this alone.',
+        )
+        parser.add_argument(
+            '--recount', action='store_true',
+            help='Rebuild blob reference counts from the attachment rows first.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report what would be reclaimed without changing anything.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.dry_run = options['dry_run']
+        self.cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+
+        if options['recount'] and not self.dry_run:
+            self.stdout.write(f"Recounted {self.recount()} blob(s).")
+        if not self.dry_run:
+            self.stdout.write(f"Moved {self.adopt_legacy()} legacy attachment(s) into blobs.")
+        blobs, blob_bytes = self.reclaim_blobs()
+        files, file_bytes = self.reclaim_legacy_files()
+
+        verb = "Would reclaim" if self.dry_run else "Reclaimed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {blobs} blob(s) and {files} legacy file(s), {blob_bytes + file_bytes} bytes."
+        ))
+
+    def recount(self):
+        recounted = 0
+        last_sha = ''
+        while True:
+            rows = list(
+                AttachmentBlob.objects.filter(sha256__gt=last_sha).order_by('sha256')
+                .annotate(refs=Count('attachments')).values_list('sha256', 'ref_count', 'refs')[:self.batch_size]
+            )
+            if not rows:
+                return recounted
+            last_sha = rows[-1][0]
+            for sha256, ref_count, refs in rows:
+                if ref_count != refs:
+                    AttachmentBlob.objects.filter(pk=sha256).update(ref_count=refs)
+                    recounted += 1
+
+    def adopt_legacy(self):
+        adopted = 0
+        last_id = 0
+        while True:
+            attachments = list(
+                Attachment.objects.filter(blob__isnull=True, id__gt=last_id).order_by('id')[:self.batch_size]
+            )
+            if not attachments:
+                return adopted
+            last_id = attachments[-1].id
+
+            for attachment in attachments:
+                legacy_name = attachment.file.name
+                if not legacy_name or not default_storage.exists(legacy_name):
+                    self.stderr.write(f"Attachment {attachment.id}: file {legacy_name!r} is missing, skipped.")
+                    continue
+                filename = os.path.basename(legacy_name)
+                with transaction.atomic():
+                    with default_storage.open(legacy_name, 'rb') as content:
+                        blob = AttachmentBlob.objects.store(content, filename)
+                    Attachment.objects.filter(pk=attachment.pk).update(
+                        blob=blob, file=blob.file.name, filename=attachment.filename or filename,
+                    )
+                    # update() skips post_save, so take the reference by hand.
+                    # The legacy file is left for reclaim_legacy_files.
+                    AttachmentBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') + 1)
+                adopted += 1
+
+    def reclaim_blobs(self):
+        reclaimed = reclaimed_bytes = 0
+        last_sha = ''
+        while True:
+            candidates = list(
+                AttachmentBlob.objects.filter(ref_count=0, created_at__lt=self.cutoff, sha256__gt=last_sha)
+                .order_by('sha256')[:self.batch_size]
+            )
+            if not candidates:
+                return reclaimed, reclaimed_bytes
+            last_sha = candidates[-1].sha256
+
+            with transaction.atomic():
+                # Re-check under lock: an upload may have taken a reference
+                # since the candidates were read. AttachmentBlob.objects.store
+                # holds the same lock until its Attachment commits.
+                blobs = list(
+                    AttachmentBlob.objects.select_for_update()
+                    .filter(pk__in=[blob.pk for blob in candidates], ref_count=0)
+                    .exclude(Exists(Attachment.objects.filter(blob=OuterRef('pk'))))
+                )
+                reclaimed += len(blobs)
+                reclaimed_bytes += sum(blob.size for blob in blobs)
+                if self.dry_run or not blobs:
+                    continue
+                AttachmentBlob.objects.filter(pk__in=[blob.pk for blob in blobs]).delete()
+                names = [name for blob in blobs for name in (blob.file.name, *(blob.variants or {}).values())]
+                transaction.on_commit(lambda names=names: self.delete_files(names))
+
+    def reclaim_legacy_files(self):
+        try:
+            _, filenames = default_storage.listdir(LEGACY_DIR)
+        except (FileNotFoundError, NotImplementedError):
+            return 0, 0
+
+        reclaimed = reclaimed_bytes = 0
+        for start in range(0, len(filenames), self.batch_size):
+            names = [f'{LEGACY_DIR}/{filename}' for filename in filenames[start:start + self.batch_size]]
+            referenced = set(Attachment.objects.filter(file__in=names).values_list('file', flat=True))
+            orphans = [
+                name for name in names
+                if name not in referenced and default_storage.get_modified_time(name) < self.cutoff
+            ]
+            reclaimed += len(orphans)
+            reclaimed_bytes += sum(default_storage.size(name) for name in orphans)
+            if not self.dry_run:
+                self.delete_files(orphans)
+        return reclaimed, reclaimed_bytes
+
+    def delete_files(self, names):
+        for name in names:
+            default_storage.delete(name)
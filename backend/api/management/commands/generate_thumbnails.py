@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from api.models import AttachmentBlob, Profile
+from api.thumbnails import generate_blob_variants, generate_profile_variants
+
+
+class Command(BaseCommand):
+    help = "Renders missing thumbnails for profile pictures and image attachments in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=100,
+            help='Number of images loaded per query.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        profiles = self.backfill(
+            Profile.objects.exclude(profile_picture='').filter(profile_picture__isnull=False, picture_variants__isnull=True),
+            generate_profile_variants, batch_size,
+        )
+        blobs = self.backfill(
+            AttachmentBlob.objects.filter(content_type__startswith='image/', variants__isnull=True),
+            generate_blob_variants, batch_size,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered thumbnails for {profiles} profile picture(s) and {blobs} image attachment(s)."
+        ))
+
+    def backfill(self, queryset, generate, batch_size):
+        done = 0
+        last_pk = None
+        while True:
+            batch = queryset.order_by('pk')
+            if last_pk is not None:
+                batch = batch.filter(pk__gt=last_pk)
+            pks = list(batch.values_list('pk', flat=True)[:batch_size])
+            if not pks:
+                return done
+            last_pk = pks[-1]
+            for pk in pks:
+                generate(pk)
+                done += 1
@@ -0,0 +1,68 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from api.caching import invalidate_project_dashboards
+from api.models import ProjectStats, Task, log_task_status_changes
+
+# Statuses that still count as open work; anything overdue in these is missed.
+OPEN_STATUSES = ['To Do', 'In Progress', 'Pending']
+
+
+class Command(BaseCommand):
+    help = "Marks overdue open tasks as 'Missed' in bounded batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Maximum number of tasks updated per statement.',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Seconds between sweeps. When omitted the command sweeps once and exits.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        interval = options['interval']
+
+        while True:
+            marked = self.sweep(batch_size)
+            self.stdout.write(f"Marked {marked} overdue task(s) as Missed.")
+            if not interval:
+                break
+            time.sleep(interval)
+
+    def sweep(self, batch_size):
+        today = timezone.now().date()
+        overdue = Task.objects.filter(status__in=OPEN_STATUSES, due_date__lt=today)
+        marked = 0
+
+        while True:
+            # Each batch is a short UPDATE keyed on primary keys picked through
+            # the (status, due_date) index, so no long table-wide lock is held.
+            batch = list(overdue.values_list('id', flat=True)[:batch_size])
+            if not batch:
+                break
+            with transaction.atomic():
+                rows = list(
+                    Task.objects.select_for_update()
+                    .filter(id__in=batch, status__in=OPEN_STATUSES)
+                    .values_list('id', 'project_id', 'status')
+                )
+                ids = [row[0] for row in rows]
+                # update() skips auto_now, so stamp updated_at as save() would.
+                marked += Task.objects.filter(id__in=ids).update(status='Missed', updated_at=timezone.now())
+
+                # update() skips the post_save signals, so move the rollup
+                # counts across by hand.
+                ProjectStats.record_task_changes(
+                    (project_id, status, project_id, 'Missed') for _, project_id, status in rows
+                )
+                # ...and log the 'missed' events the Task post_save would have.
+                log_task_status_changes(Task.objects.filter(id__in=ids).select_related('project__owner'))
+                invalidate_project_dashboards(project_id for _, project_id, _ in rows)
+
+        return marked
@@ -0,0 +1,181 @@
+import gzip
+import json
+import os
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Case, Count, IntegerField, Max, Q, Sum, When
+from django.utils import timezone
+
+from api.models import Notification, Profile
+
+ARCHIVE_FIELDS = ('id', 'user_id', 'task_id', 'message', 'count', 'is_read', 'created_at')
+GROUPS_PER_STATEMENT = 200
+
+
+class Command(BaseCommand):
+    help = (
+        "Collapses repeated notifications into one row with a count and purges "
+        "old read ones, archiving every removed row to gzipped JSONL. Works in "
+        "batches that each commit on their own, so an interrupted run can simply "
+        "be started again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.NOTIFICATION_RETENTION_DAYS,
+            help='Purge read notifications older than this many days.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help=(
+                'Number of rows purged per transaction, and of users scanned per pass '
+                'when collapsing (each inbox is collapsed in its own transaction).'
+            ),
+        )
+        parser.add_argument(
+            '--archive-dir', default=settings.NOTIFICATION_ARCHIVE_DIR,
+            help='Directory the gzipped JSONL archives are appended to.',
+        )
+        parser.add_argument(
+            '--no-archive', action='store_true',
+            help='Delete without writing archives.',
+        )
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        self.archive_path = None
+        if not options['no_archive']:
+            os.makedirs(options['archive_dir'], exist_ok=True)
+            self.archive_path = os.path.join(
+                options['archive_dir'], f"notifications-{timezone.now():%Y%m%d}.jsonl.gz"
+            )
+
+        collapsed = self.report('Collapsed', self.collapse_repeats)
+        purged = self.report('Purged', self.purge_read, timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(
+            f"Removed {collapsed + purged} notification(s): {collapsed} collapsed, {purged} expired."
+        ))
+
+    def report(self, label, step, *args):
+        started = time.monotonic()
+        removed = 0
+        for batch in step(*args):
+            removed += batch
+            elapsed = time.monotonic() - started
+            self.stdout.write(f"{label} {removed} row(s), {removed / max(elapsed, 1e-6):.0f} rows/s.")
+        return removed
+
+    def archive(self, rows, reason):
+        """
+        Appends rows to today's archive and syncs it before the caller deletes
+        them. A batch that then rolls back is archived again on the next run,
+        so restores should keep one line per id.
+        """
+        if not self.archive_path or not rows:
+            return
+        # Each batch is a separate gzip member; gzip readers concatenate them.
+        with gzip.open(self.archive_path, 'at', encoding='utf-8') as fh:
+            for row in rows:
+                fh.write(json.dumps({**row, 'created_at': row['created_at'].isoformat(), 'reason': reason}) + '\n')
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def purge_read(self, cutoff):
+        last_id = 0
+        while True:
+            with transaction.atomic():
+                rows = list(
+                    Notification.objects.select_for_update()
+                    .filter(is_read=True, created_at__lt=cutoff, id__gt=last_id)
+                    .order_by('id').values(*ARCHIVE_FIELDS)[:self.batch_size]
+                )
+                if not rows:
+                    return
+                last_id = rows[-1]['id']
+                self.archive(rows, 'expired')
+                # Read rows leave the unread counters alone.
+                Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+            yield len(rows)
+
+    def collapse_repeats(self):
+        """
+        Folds notifications with the same user, task and message into the
+        newest of them, summing their counts. The survivor stays unread if any
+        of the folded rows was.
+        """
+        last_user = 0
+        while True:
+            user_ids = list(
+                User.objects.filter(id__gt=last_user).order_by('id')
+                .values_list('id', flat=True)[:self.batch_size]
+            )
+            if not user_ids:
+                return
+            last_user = user_ids[-1]
+            # Find the inboxes with repeats without locking anything, then
+            # collapse each in its own transaction, so a run holds at most one
+            # user's inbox locked at a time.
+            repeating = set(
+                Notification.objects.filter(user_id__in=user_ids)
+                .values('user_id', 'task_id', 'message').annotate(rows=Count('id')).filter(rows__gt=1)
+                .order_by().values_list('user_id', flat=True)
+            )
+            removed = 0
+            for user_id in sorted(repeating):
+                with transaction.atomic():
+                    removed += self.collapse_inbox(user_id)
+            if removed:
+                yield removed
+
+    def collapse_inbox(self, user_id):
+        # Lock the inbox so a concurrent mark-read cannot slip between the
+        # grouping and the writes below; FOR UPDATE cannot take a GROUP BY.
+        list(Notification.objects.select_for_update().filter(user_id=user_id).values_list('id', flat=True))
+        groups = list(
+            Notification.objects.filter(user_id=user_id)
+            .values('user_id', 'task_id', 'message')
+            .annotate(
+                rows=Count('id'), newest=Max('id'), total=Sum('count'),
+                unread=Sum(Case(When(is_read=False, then=1), default=0, output_field=IntegerField())),
+            )
+            .filter(rows__gt=1).order_by()
+        )
+        if not groups:
+            return 0
+
+        removed = 0
+        # Keeps each OR of group conditions well under SQLite's expression depth limit.
+        for start in range(0, len(groups), GROUPS_PER_STATEMENT):
+            removed += self.collapse_groups(groups[start:start + GROUPS_PER_STATEMENT])
+        return removed
+
+    def collapse_groups(self, groups):
+        duplicates = Q()
+        unread_deltas = {}
+        for group in groups:
+            duplicates |= Q(
+                user_id=group['user_id'], task_id=group['task_id'],
+                message=group['message'], id__lt=group['newest'],
+            )
+            Notification.objects.filter(pk=group['newest']).update(
+                count=group['total'], is_read=not group['unread'],
+            )
+            # The group's unread rows become at most one unread survivor.
+            unread_deltas[group['user_id']] = (
+                unread_deltas.get(group['user_id'], 0) + bool(group['unread']) - group['unread']
+            )
+
+        rows = list(Notification.objects.filter(duplicates).order_by('id').values(*ARCHIVE_FIELDS))
+        self.archive(rows, 'collapsed')
+        # Mark them read first so deleting them does not also decrement the
+        # counters row by row; the net change is applied once per user.
+        doomed = Notification.objects.filter(id__in=[row['id'] for row in rows])
+        doomed.update(is_read=True)
+        doomed.delete()
+        Profile.bump_unread(unread_deltas)
+        return len(rows)
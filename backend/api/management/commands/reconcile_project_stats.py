@@ -0,0 +1,123 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+
+from api.models import ActivityFeed, Expense, Project, ProjectStats, Task, TeamMember
+
+STAT_FIELDS = [
+    'total_tasks', 'done_tasks', 'in_progress_tasks', 'pending_tasks',
+    'missed_tasks', 'expense_total', 'member_count', 'last_activity_at',
+]
+
+
+def compute_project_stats(project_ids):
+    """Returns the true rollup values for the given projects, keyed by project ID."""
+    stats = {
+        project_id: {
+            'total_tasks': 0, 'done_tasks': 0, 'in_progress_tasks': 0,
+            'pending_tasks': 0, 'missed_tasks': 0, 'expense_total': Decimal('0.00'),
+            'member_count': 0, 'last_activity_at': None,
+        }
+        for project_id in project_ids
+    }
+
+    task_counts = Task.objects.filter(project_id__in=project_ids).values('project_id').annotate(
+        total_tasks=Count('id'),
+        **{
+            field: Count('id', filter=Q(status=status))
+            for status, field in ProjectStats.STATUS_FIELDS.items()
+        },
+    )
+    for row in task_counts:
+        stats[row.pop('project_id')].update(row)
+
+    expense_totals = Expense.objects.filter(project_id__in=project_ids).values('project_id').annotate(
+        expense_total=Sum('amount'),
+    )
+    for row in expense_totals:
+        stats[row['project_id']]['expense_total'] = row['expense_total']
+
+    member_counts = TeamMember.objects.filter(project_id__in=project_ids).values('project_id').annotate(
+        member_count=Count('id'),
+    )
+    for row in member_counts:
+        stats[row['project_id']]['member_count'] = row['member_count']
+
+    # Archived logs still count as the project's last activity.
+    last_activity = ActivityFeed.objects.filter(project_id__in=project_ids).values('project_id').annotate(
+        last_activity_at=Max('timestamp'),
+    )
+    for row in last_activity:
+        stats[row['project_id']]['last_activity_at'] = row['last_activity_at']
+
+    return stats
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the ProjectStats rollup table in chunks and reports any drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=500,
+            help='Number of projects recomputed per transaction.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Report drift without writing corrections.',
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        dry_run = options['dry_run']
+        last_id = 0
+        checked = drifted = 0
+
+        while True:
+            project_ids = list(
+                Project.objects.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:chunk_size]
+            )
+            if not project_ids:
+                break
+            last_id = project_ids[-1]
+
+            with transaction.atomic():
+                # Lock before counting: a concurrent write then either bumped
+                # the row before the lock, so its change is counted here, or
+                # waits and applies its delta on top of the corrected values.
+                current = {
+                    stats.project_id: stats
+                    for stats in ProjectStats.objects.select_for_update().filter(project_id__in=project_ids)
+                }
+                expected = compute_project_stats(project_ids)
+
+                for project_id, values in expected.items():
+                    checked += 1
+                    stats = current.get(project_id)
+                    if stats is None:
+                        drift = ['missing row']
+                    else:
+                        drift = [
+                            f"{field} {getattr(stats, field)} -> {values[field]}"
+                            for field in STAT_FIELDS
+                            if getattr(stats, field) != values[field]
+                        ]
+                    if not drift:
+                        continue
+
+                    drifted += 1
+                    self.stdout.write(f"Project {project_id}: {', '.join(drift)}")
+                    if dry_run:
+                        continue
+                    if stats is None:
+                        ProjectStats.objects.create(project_id=project_id, **values)
+                    else:
+                        ProjectStats.objects.filter(project_id=project_id).update(
+                            version=F('version') + 1, **values
+                        )
+
+        summary = f"Checked {checked} project(s), {drifted} with drift."
+        if drifted and not dry_run:
+            summary += " Drift corrected."
+        self.stdout.write(self.style.SUCCESS(summary))
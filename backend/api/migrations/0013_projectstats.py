@@ -0,0 +1,61 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Q, Sum
+
+
+def backfill_project_stats(apps, schema_editor):
+    Project = apps.get_model('api', 'Project')
+    ProjectStats = apps.get_model('api', 'ProjectStats')
+    Task = apps.get_model('api', 'Task')
+    Expense = apps.get_model('api', 'Expense')
+    TeamMember = apps.get_model('api', 'TeamMember')
+    ActivityLog = apps.get_model('api', 'ActivityLog')
+
+    stats = {project_id: {} for project_id in Project.objects.values_list('id', flat=True)}
+
+    for row in Task.objects.values('project_id').annotate(
+        total_tasks=Count('id'),
+        done_tasks=Count('id', filter=Q(status='Done')),
+        in_progress_tasks=Count('id', filter=Q(status='In Progress')),
+        pending_tasks=Count('id', filter=Q(status='Pending')),
+        missed_tasks=Count('id', filter=Q(status='Missed')),
+    ):
+        stats[row.pop('project_id')].update(row)
+    for row in Expense.objects.values('project_id').annotate(expense_total=Sum('amount')):
+        stats[row.pop('project_id')].update(row)
+    for row in TeamMember.objects.values('project_id').annotate(member_count=Count('id')):
+        stats[row.pop('project_id')].update(row)
+    for row in ActivityLog.objects.exclude(project=None).values('project_id').annotate(last_activity_at=Max('timestamp')):
+        stats[row.pop('project_id')].update(row)
+
+    ProjectStats.objects.bulk_create(
+        [ProjectStats(project_id=project_id, **values) for project_id, values in stats.items()],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_task_status_due_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectStats',
+            fields=[
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='api.project')),
+                ('total_tasks', models.IntegerField(default=0)),
+                ('done_tasks', models.IntegerField(default=0)),
+                ('in_progress_tasks', models.IntegerField(default=0)),
+                ('pending_tasks', models.IntegerField(default=0)),
+                ('missed_tasks', models.IntegerField(default=0)),
+                ('expense_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('member_count', models.IntegerField(default=0)),
+                ('last_activity_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_project_stats, migrations.RunPython.noop),
+    ]
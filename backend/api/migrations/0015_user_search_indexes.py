@@ -0,0 +1,38 @@
+from django.db import migrations
+
+# Prefix indexes for the user search endpoint. istartswith compiles to
+# UPPER(col::text) LIKE UPPER('q%') on PostgreSQL and to a case-insensitive
+# LIKE on SQLite, so each backend needs its own expression/collation.
+INDEXES = {
+    'postgresql': [
+        "CREATE INDEX IF NOT EXISTS api_user_username_prefix_idx ON auth_user (UPPER(username::text) text_pattern_ops)",
+        "CREATE INDEX IF NOT EXISTS api_user_email_prefix_idx ON auth_user (UPPER(email::text) text_pattern_ops)",
+    ],
+    'sqlite': [
+        "CREATE INDEX IF NOT EXISTS api_user_username_prefix_idx ON auth_user (username COLLATE NOCASE)",
+        "CREATE INDEX IF NOT EXISTS api_user_email_prefix_idx ON auth_user (email COLLATE NOCASE)",
+    ],
+}
+
+
+def create_indexes(apps, schema_editor):
+    for statement in INDEXES.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in INDEXES:
+        schema_editor.execute("DROP INDEX IF EXISTS api_user_username_prefix_idx")
+        schema_editor.execute("DROP INDEX IF EXISTS api_user_email_prefix_idx")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_activitylog_project_ts_idx'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_user_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectstats',
+            name='version',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,101 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# The inverted index behind /api/search/. SQLite gets an external-content
+# FTS5 table fed by triggers; PostgreSQL gets a generated, weighted tsvector
+# column with a GIN index. Other backends fall back to LIKE in api/search.py.
+SEARCH_INDEX = {
+    'sqlite': [
+        "CREATE VIRTUAL TABLE api_searchdocument_fts USING fts5("
+        "title, body, content='api_searchdocument', content_rowid='id', "
+        "tokenize='unicode61 remove_diacritics 2', prefix='2 3')",
+        "CREATE TRIGGER api_searchdocument_fts_ai AFTER INSERT ON api_searchdocument BEGIN "
+        "INSERT INTO api_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+        "CREATE TRIGGER api_searchdocument_fts_ad AFTER DELETE ON api_searchdocument BEGIN "
+        "INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); END",
+        "CREATE TRIGGER api_searchdocument_fts_au AFTER UPDATE OF title, body ON api_searchdocument BEGIN "
+        "INSERT INTO api_searchdocument_fts(api_searchdocument_fts, rowid, title, body) "
+        "VALUES ('delete', old.id, old.title, old.body); "
+        "INSERT INTO api_searchdocument_fts(rowid, title, body) VALUES (new.id, new.title, new.body); END",
+    ],
+    'postgresql': [
+        "ALTER TABLE api_searchdocument ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+        "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple', coalesce(body, '')), 'B')) STORED",
+        "CREATE INDEX api_searchdocument_vector_idx ON api_searchdocument USING GIN (search_vector)",
+    ],
+}
+
+DROP_SEARCH_INDEX = {
+    'sqlite': [
+        "DROP TRIGGER IF EXISTS api_searchdocument_fts_ai",
+        "DROP TRIGGER IF EXISTS api_searchdocument_fts_ad",
+        "DROP TRIGGER IF EXISTS api_searchdocument_fts_au",
+        "DROP TABLE IF EXISTS api_searchdocument_fts",
+    ],
+    'postgresql': [
+        "DROP INDEX IF EXISTS api_searchdocument_vector_idx",
+        "ALTER TABLE api_searchdocument DROP COLUMN IF EXISTS search_vector",
+    ],
+}
+
+
+def create_search_index(apps, schema_editor):
+    for statement in SEARCH_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    for statement in DROP_SEARCH_INDEX.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+def backfill_search_documents(apps, schema_editor):
+    SearchDocument = apps.get_model('api', 'SearchDocument')
+    sources = [
+        ('project', apps.get_model('api', 'Project').objects.values_list('id', 'id', models.Value(None, output_field=models.BigIntegerField()), 'title', 'description')),
+        ('task', apps.get_model('api', 'Task').objects.values_list('id', 'project_id', 'id', 'title', 'description')),
+        ('comment', apps.get_model('api', 'Comment').objects.values_list('id', 'task__project_id', 'task_id', models.Value('', output_field=models.TextField()), 'content')),
+    ]
+    for kind, rows in sources:
+        batch = []
+        for object_id, project_id, task_id, title, body in rows.order_by('id').iterator(chunk_size=2000):
+            batch.append(SearchDocument(
+                kind=kind, object_id=object_id, project_id=project_id, task_id=task_id,
+                title=title or '', body=body or '',
+            ))
+            if len(batch) == 2000:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_comment_task_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('project', 'Project'), ('task', 'Task'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('title', models.CharField(blank=True, max_length=255)),
+                ('body', models.TextField(blank=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.task')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('kind', 'object_id'), name='searchdocument_object_uniq')],
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(backfill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_unread_counts(apps, schema_editor):
+    Notification = apps.get_model('api', 'Notification')
+    Profile = apps.get_model('api', 'Profile')
+    unread = (
+        Notification.objects.filter(is_read=False)
+        .values('user_id').annotate(total=models.Count('id')).order_by()
+    )
+    for row in unread.iterator():
+        Profile.objects.filter(user_id=row['user_id']).update(unread_notifications=row['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_searchdocument'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='unread_notifications',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='notification_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['user', 'is_read', 'created_at'], name='notification_unread_idx'),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
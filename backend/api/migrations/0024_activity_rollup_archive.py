@@ -0,0 +1,101 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:10
+
+import django.db.models.deletion
+from django.conf import settings
+from collections import Counter
+
+from django.db import migrations, models
+from django.utils import timezone
+
+COLUMNS = 'id, project_id, task_id, user_id, action, timestamp'
+
+CREATE_FEED_VIEW = (
+    f"CREATE VIEW api_activityfeed AS "
+    f"SELECT {COLUMNS} FROM api_activitylog UNION ALL SELECT {COLUMNS} FROM api_archivedactivitylog"
+)
+
+# Frozen copy of api.models.ACTION_PREFIXES as of this migration.
+ACTION_PREFIXES = [
+    ('added task ', 'task_created'),
+    ('completed task ', 'task_completed'),
+    ('missed due date ', 'task_missed'),
+    ('assigned ', 'task_assigned'),
+    ('unassigned ', 'task_unassigned'),
+    ('deleted task ', 'task_deleted'),
+    ('added an expense', 'expense_added'),
+    ('added ', 'member_added'),
+]
+
+
+def activity_type(action):
+    for prefix, action_type in ACTION_PREFIXES:
+        if action.startswith(prefix):
+            return action_type
+    return 'other'
+
+
+def backfill_activity_rollup(apps, schema_editor):
+    ActivityLog = apps.get_model('api', 'ActivityLog')
+    ActivityRollup = apps.get_model('api', 'ActivityRollup')
+    counts = Counter(
+        (project_id, user_id, timezone.localdate(timestamp), activity_type(action))
+        for project_id, user_id, timestamp, action in ActivityLog.objects.filter(project__isnull=False)
+        .values_list('project_id', 'user_id', 'timestamp', 'action').order_by('id').iterator(chunk_size=2000)
+    )
+    ActivityRollup.objects.bulk_create([
+        ActivityRollup(project_id=project_id, user_id=user_id, day=day, action_type=action_type, count=count)
+        for (project_id, user_id, day, action_type), count in counts.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0023_notification_task_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityFeed',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(max_length=255)),
+                ('timestamp', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'api_activityfeed',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='ActivityRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action_type', models.CharField(choices=[('task_created', 'Task created'), ('task_completed', 'Task completed'), ('task_missed', 'Task missed'), ('task_assigned', 'Task assigned'), ('task_unassigned', 'Task unassigned'), ('task_deleted', 'Task deleted'), ('expense_added', 'Expense added'), ('member_added', 'Member added'), ('other', 'Other')], max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='api.project')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'day'], name='activity_rollup_day_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedActivityLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(max_length=255)),
+                ('timestamp', models.DateTimeField()),
+                ('project', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.project')),
+                ('task', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='api.task')),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project', 'timestamp', 'id'], name='activity_archive_ts_idx')],
+            },
+        ),
+        migrations.RunSQL(CREATE_FEED_VIEW, 'DROP VIEW api_activityfeed'),
+        migrations.RunPython(backfill_activity_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,194 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:13
+
+import re
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+OUTCOME_EVENTS = ['task_completed', 'task_missed']
+
+# The action texts written before event types existed, most specific first.
+ACTION_PATTERNS = [
+    (re.compile(r"^added task '(?P<subject>.*)'$", re.S), 'task_created'),
+    (re.compile(r"^completed task '(?P<subject>.*)'$", re.S), 'task_completed'),
+    (re.compile(r"^missed due date for task '(?P<subject>.*)'$", re.S), 'task_missed'),
+    (re.compile(r"^assigned (?P<target>\S+) to task '(?P<subject>.*)'$", re.S), 'task_assigned'),
+    (re.compile(r"^unassigned (?P<target>\S+) from task '(?P<subject>.*)'$", re.S), 'task_unassigned'),
+    (re.compile(r"^deleted task '(?P<subject>.*)'$", re.S), 'task_deleted'),
+    (re.compile(r"^added an expense: (?P<subject>.*)$", re.S), 'expense_added'),
+    (re.compile(r"^added (?P<target>\S+) to the team$", re.S), 'member_added'),
+]
+
+OLD_COLUMNS = 'id, project_id, task_id, user_id, action, timestamp'
+NEW_COLUMNS = 'id, project_id, task_id, user_id, event_type, target_user_id, subject, action, timestamp'
+
+
+DROP_FEED_VIEW = "DROP VIEW api_activityfeed"
+
+
+def create_feed_view(columns):
+    return (
+        f"CREATE VIEW api_activityfeed AS SELECT {columns} FROM api_activitylog "
+        f"UNION ALL SELECT {columns} FROM api_archivedactivitylog"
+    )
+
+
+def parse_action(action):
+    """Returns (event_type, target username or None, subject), or None."""
+    for pattern, event_type in ACTION_PATTERNS:
+        match = pattern.match(action)
+        if match:
+            groups = match.groupdict()
+            return event_type, groups.get('target'), groups.get('subject', '')
+    return None
+
+
+def backfill_model(apps, model_name):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Model = apps.get_model('api', model_name)
+    last_id = 0
+    while True:
+        logs = list(Model.objects.filter(id__gt=last_id).order_by('id').only('id', 'action')[:BATCH_SIZE])
+        if not logs:
+            return
+        last_id = logs[-1].id
+
+        parsed = {log.id: parse_action(log.action) for log in logs}
+        usernames = {result[1] for result in parsed.values() if result and result[1]}
+        user_ids = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+        changed = []
+        for log in logs:
+            if not parsed[log.id]:
+                continue
+            log.event_type, target, log.subject = parsed[log.id]
+            log.subject = log.subject[:255]
+            log.target_user_id = user_ids.get(target)
+            # Keep the original text when the target user is gone, since it
+            # can no longer be rendered from the row.
+            if not target or log.target_user_id:
+                log.action = ''
+            changed.append(log)
+        Model.objects.bulk_update(changed, ['event_type', 'target_user', 'subject', 'action'])
+
+
+# Frozen copy of api.models.ACTIVITY_TEMPLATES as of this migration.
+TEMPLATES = {
+    'task_created': "added task '{subject}'",
+    'task_completed': "completed task '{subject}'",
+    'task_missed': "missed due date for task '{subject}'",
+    'task_assigned': "assigned {target} to task '{subject}'",
+    'task_unassigned': "unassigned {target} from task '{subject}'",
+    'task_deleted': "deleted task '{subject}'",
+    'expense_added': "added an expense: {subject}",
+    'member_added': "added {target} to the team",
+}
+
+
+def restore_model(apps, model_name):
+    Model = apps.get_model('api', model_name)
+    last_id = 0
+    while True:
+        logs = list(
+            Model.objects.filter(id__gt=last_id).order_by('id')
+            .select_related('target_user').only('id', 'event_type', 'subject', 'action', 'target_user__username')[:BATCH_SIZE]
+        )
+        if not logs:
+            return
+        last_id = logs[-1].id
+        changed = []
+        for log in logs:
+            if log.action or log.event_type not in TEMPLATES:
+                continue
+            target = log.target_user.username if log.target_user_id else 'a removed user'
+            log.action = TEMPLATES[log.event_type].format(subject=log.subject, target=target)[:255]
+            changed.append(log)
+        Model.objects.bulk_update(changed, ['action'])
+
+
+def restore_action_text(apps, schema_editor):
+    restore_model(apps, 'ActivityLog')
+    restore_model(apps, 'ArchivedActivityLog')
+
+
+def backfill_event_types(apps, schema_editor):
+    backfill_model(apps, 'ActivityLog')
+    backfill_model(apps, 'ArchivedActivityLog')
+
+    # Older code could log the same outcome twice; keep the first as the
+    # event and turn the rest back into plain text so the constraint holds.
+    ActivityLog = apps.get_model('api', 'ActivityLog')
+    repeated = (
+        ActivityLog.objects.filter(task__isnull=False, event_type__in=OUTCOME_EVENTS)
+        .values('task_id', 'event_type').annotate(rows=models.Count('id'), first=models.Min('id'))
+        .filter(rows__gt=1).order_by()
+    )
+    for group in repeated:
+        extras = ActivityLog.objects.filter(
+            task_id=group['task_id'], event_type=group['event_type'], id__gt=group['first'],
+        )
+        for log in extras:
+            log.action = TEMPLATES[log.event_type].format(subject=log.subject)[:255]
+            log.event_type = 'other'
+            log.save(update_fields=['action', 'event_type'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0024_activity_rollup_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # SQLite cannot rebuild a table that a view reads from.
+        migrations.RunSQL(DROP_FEED_VIEW, create_feed_view(OLD_COLUMNS)),
+        migrations.AddField(
+            model_name='activitylog',
+            name='event_type',
+            field=models.CharField(choices=[('task_created', 'Task created'), ('task_completed', 'Task completed'), ('task_missed', 'Task missed'), ('task_assigned', 'Task assigned'), ('task_unassigned', 'Task unassigned'), ('task_deleted', 'Task deleted'), ('expense_added', 'Expense added'), ('member_added', 'Member added'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='subject',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='activitylog',
+            name='target_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='archivedactivitylog',
+            name='event_type',
+            field=models.CharField(choices=[('task_created', 'Task created'), ('task_completed', 'Task completed'), ('task_missed', 'Task missed'), ('task_assigned', 'Task assigned'), ('task_unassigned', 'Task unassigned'), ('task_deleted', 'Task deleted'), ('expense_added', 'Expense added'), ('member_added', 'Member added'), ('other', 'Other')], default='other', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='archivedactivitylog',
+            name='subject',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='archivedactivitylog',
+            name='target_user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='activitylog',
+            name='action',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='archivedactivitylog',
+            name='action',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.RunPython(backfill_event_types, restore_action_text),
+        migrations.RunSQL(create_feed_view(NEW_COLUMNS), DROP_FEED_VIEW),
+        migrations.AddConstraint(
+            model_name='activitylog',
+            constraint=models.UniqueConstraint(condition=models.Q(('event_type__in', ['task_completed', 'task_missed'])), fields=('task', 'event_type'), name='activity_task_outcome_uniq'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0025_activity_event_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='access_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+KEY_FIELDS = ['project_id', 'user_id', 'day', 'action_type']
+
+
+def merge_duplicate_keys(apps, schema_editor):
+    """Folds rows that share a key into the oldest one before the constraint."""
+    ActivityRollup = apps.get_model('api', 'ActivityRollup')
+    duplicates = list(
+        ActivityRollup.objects.filter(user__isnull=False)
+        .values(*KEY_FIELDS)
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for group in duplicates:
+        rows = ActivityRollup.objects.filter(**{field: group[field] for field in KEY_FIELDS})
+        rows.filter(pk=group['keep']).update(count=group['total'])
+        rows.exclude(pk=group['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0026_profile_access_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_keys, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='activityrollup',
+            constraint=models.UniqueConstraint(fields=('project', 'user', 'day', 'action_type'), name='activity_rollup_key_uniq'),
+        ),
+    ]
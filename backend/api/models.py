@@ -1,14 +1,41 @@
+import hashlib
+import mimetypes
+import os
+import uuid
+from collections import Counter, defaultdict
+from contextlib import suppress
+
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save, m2m_changed
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.db import IntegrityError, router, transaction
+from django.db.models.deletion import Collector
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
 from django.dispatch import receiver
 from django.utils import timezone
 from django.conf import settings
 
+from .caching import invalidate_dashboards, invalidate_project_dashboards, invalidate_project_access
+from .events import notification_broker
+from .thumbnails import generate_blob_variants, generate_profile_variants, schedule as schedule_thumbnails
+
+class TracksLoadedValuesMixin:
+    """
+    Keeps the values an instance was loaded with in ``_loaded_values``, so
+    the signal handlers can tell what a save changed and apply deltas.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 # -----------------------
 # USER PROFILE
 # -----------------------
-class Profile(models.Model):
+class Profile(TracksLoadedValuesMixin, models.Model):
     ROLE_CHOICES = [
         ('Student', 'Student'),
         ('Teacher', 'Teacher'),
@@ -17,7 +44,47 @@ class Profile(models.Model):
     role = models.CharField(max_length=20, choices=ROLE_CHOICES, default='Student')
     course = models.CharField(max_length=100, blank=True)
     profile_picture = models.ImageField(upload_to='profile_pics/', null=True, blank=True)
+    # Resized copies of the picture by size label; null until rendered.
+    picture_variants = models.JSONField(null=True, blank=True, editable=False)
     bio = models.TextField(blank=True)
+    # Kept current by the notification signals and mark-read, so the badge
+    # count is a primary-key read instead of a COUNT over the inbox.
+    unread_notifications = models.PositiveIntegerField(default=0, editable=False)
+    # Bumped whenever the user's owned or member projects change; cached
+    # access indexes are only used while they match it (see api.access).
+    access_version = models.PositiveIntegerField(default=0, editable=False)
+
+    # Only ever changed with F() updates, so saving a stale instance must not
+    # write them back.
+    COUNTER_FIELDS = {'unread_notifications', 'access_version'}
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_unread(cls, deltas):
+        """
+        Applies {user_id: delta} to the unread counters, never going below
+        zero. Users sharing a delta are updated together, so notifying many
+        users at once costs one query.
+        """
+        by_delta = {}
+        for user_id, delta in deltas.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(user_id)
+        for delta, user_ids in by_delta.items():
+            cls.objects.filter(user_id__in=user_ids).update(
+                unread_notifications=Greatest(F('unread_notifications') + delta, 0)
+            )
+
+    @classmethod
+    def bump_access_version(cls, user_ids):
+        cls.objects.filter(user_id__in=user_ids).update(access_version=F('access_version') + 1)
 
     def __str__(self):
         return self.user.username + " Profile"
@@ -25,7 +92,7 @@ class Profile(models.Model):
 # -----------------------
 # CORE MODELS
 # -----------------------
-class Project(models.Model):
+class Project(TracksLoadedValuesMixin, models.Model):
     PROJECT_TYPE_CHOICES = [
         ('Personal', 'Personal'),
         ('Collaborative', 'Collaborative'),
@@ -68,7 +135,7 @@ class Project(models.Model):
     def __str__(self):
         return self.title
 
-class TeamMember(models.Model):
+class TeamMember(TracksLoadedValuesMixin, models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='team_members')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     role = models.CharField(max_length=50, default='Member')
@@ -80,7 +147,7 @@ class TeamMember(models.Model):
     def __str__(self):
         return f"{self.user.username} in {self.project.title}"
 
-class Task(models.Model):
+class Task(TracksLoadedValuesMixin, models.Model):
     STATUS_CHOICES = [
         ('In Progress', 'In Progress'),
         ('Done', 'Done'),
@@ -102,12 +169,17 @@ class Task(models.Model):
     assigned_to = models.ManyToManyField(User, related_name='assigned_tasks', blank=True)
     due_date = models.DateField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'due_date'], name='task_status_due_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
-class Expense(models.Model):
+class Expense(TracksLoadedValuesMixin, models.Model):
     project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='expenses')
     description = models.CharField(max_length=255)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
@@ -117,6 +189,69 @@ class Expense(models.Model):
     def __str__(self):
         return f"{self.description} - ${self.amount}"
 
+class ProjectStats(models.Model):
+    """
+    Per-project rollup kept current by the signals below, so list and
+    dashboard views read one row per project instead of aggregating live.
+    Rebuild it with the reconcile_project_stats command.
+    """
+    STATUS_FIELDS = {
+        'Done': 'done_tasks',
+        'In Progress': 'in_progress_tasks',
+        'Pending': 'pending_tasks',
+        'Missed': 'missed_tasks',
+    }
+
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    total_tasks = models.IntegerField(default=0)
+    done_tasks = models.IntegerField(default=0)
+    in_progress_tasks = models.IntegerField(default=0)
+    pending_tasks = models.IntegerField(default=0)
+    missed_tasks = models.IntegerField(default=0)
+    expense_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    member_count = models.IntegerField(default=0)
+    last_activity_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every change to the project, its tasks, assignments,
+    # attachments or members; list ETags are derived from it.
+    version = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"Stats for project {self.project_id}"
+
+    @classmethod
+    def bump(cls, project_id, **deltas):
+        """Applies F-expression increments to a project's stats row."""
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if project_id is None or not deltas:
+            return
+        cls.objects.filter(project_id=project_id).update(
+            **{field: F(field) + delta for field, delta in deltas.items()}
+        )
+
+    @classmethod
+    def task_deltas(cls, status, sign):
+        deltas = {'total_tasks': sign}
+        if status in cls.STATUS_FIELDS:
+            deltas[cls.STATUS_FIELDS[status]] = sign
+        return deltas
+
+    @classmethod
+    def record_task_changes(cls, changes):
+        """
+        Applies a batch of task transitions with one bump per project, for
+        writes that bypass the post_save/post_delete signals. ``changes``
+        yields (old_project_id, old_status, new_project_id, new_status); the
+        old side is None for created tasks and the new side for deleted ones.
+        """
+        project_deltas = defaultdict(Counter)
+        for old_project_id, old_status, new_project_id, new_status in changes:
+            if old_project_id is not None:
+                project_deltas[old_project_id].update(cls.task_deltas(old_status, -1))
+            if new_project_id is not None:
+                project_deltas[new_project_id].update(cls.task_deltas(new_status, 1))
+        for project_id, deltas in project_deltas.items():
+            cls.bump(project_id, version=1, **deltas)
+
 # -----------------------
 # EXTRAS (Comments, Attachments, Notifications, Logs)
 # -----------------------
@@ -126,30 +261,371 @@ class Comment(models.Model):
     content = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['task', 'created_at', 'id'], name='comment_task_created_idx'),
+        ]
+
+def blob_upload_to(instance, filename):
+    return f'blobs/{instance.sha256[:2]}/{instance.sha256}'
+
+class AttachmentBlobManager(models.Manager):
+    def store(self, content, filename=''):
+        """
+        Returns the blob holding ``content`` (a Django File), writing it to
+        storage only when no identical file has been stored before.
+
+        Call it in the transaction that creates the referencing Attachment:
+        the blob row stays locked until then, so gc_attachments, which
+        deletes under the same lock, cannot reclaim it in between.
+        """
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+
+        with transaction.atomic():
+            blob, created = self.select_for_update().get_or_create(
+                sha256=digest.hexdigest(),
+                defaults={
+                    'size': content.size,
+                    'content_type': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+                },
+            )
+            if created:
+                blob.file.save(blob.sha256, content)
+        return blob
+
+class AttachmentBlob(models.Model):
+    """
+    A stored file, addressed by its SHA-256 and shared by every attachment
+    with the same content. ``ref_count`` is kept by the Attachment signals;
+    unreferenced blobs are reclaimed by the gc_attachments command.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    file = models.FileField(upload_to=blob_upload_to, max_length=255)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, default='application/octet-stream')
+    ref_count = models.PositiveIntegerField(default=0)
+    # Thumbnails of image blobs by size label; null until rendered.
+    variants = models.JSONField(null=True, blank=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    objects = AttachmentBlobManager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['ref_count', 'created_at'], name='blob_refcount_idx'),
+        ]
+
+    def __str__(self):
+        return self.sha256
+
 class Attachment(models.Model):
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='attachments')
-    file = models.FileField(upload_to='attachments/')
+    # Points at the blob's file; rows from before deduplication have no blob.
+    file = models.FileField(upload_to='attachments/', max_length=255)
+    blob = models.ForeignKey(AttachmentBlob, on_delete=models.PROTECT, null=True, blank=True, related_name='attachments')
+    filename = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
 
     def __str__(self):
         return f"Attachment for {self.task.title} by {self.uploaded_by.username}"    
 
-class Notification(models.Model):
+class UploadSession(models.Model):
+    """
+    A chunked attachment upload in progress. Chunks are appended to
+    ``temp_path`` and ``received`` is the committed offset, so a client can
+    resume from it after a disconnect.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='upload_sessions')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def temp_path(self):
+        return os.path.join(settings.MEDIA_ROOT, 'uploads', f'{self.pk}.part')
+
+    def __str__(self):
+        return f"Upload of {self.filename} ({self.received}/{self.size})"
+
+class SearchDocument(models.Model):
+    """
+    One row per searchable project, task or comment, kept in sync by the
+    signals below. The inverted index over title/body is vendor specific
+    (FTS5 on SQLite, a tsvector + GIN index on PostgreSQL) and is created
+    by migration 0021; see api/search.py.
+    """
+    KIND_CHOICES = [
+        ('project', 'Project'),
+        ('task', 'Task'),
+        ('comment', 'Comment'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    title = models.CharField(max_length=255, blank=True)
+    body = models.TextField(blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='searchdocument_object_uniq'),
+        ]
+
+    @classmethod
+    def index_projects(cls, projects):
+        cls._upsert('project', [
+            (project.pk, project.pk, None, project.title, project.description or '') for project in projects
+        ])
+
+    @classmethod
+    def index_tasks(cls, tasks):
+        cls._upsert('task', [
+            (task.pk, task.project_id, task.pk, task.title, task.description or '') for task in tasks
+        ])
+
+    @classmethod
+    def index_comments(cls, comments):
+        cls._upsert('comment', [
+            (comment.pk, comment.task.project_id, comment.task_id, '', comment.content) for comment in comments
+        ])
+
+    @classmethod
+    def _upsert(cls, kind, rows):
+        if not rows:
+            return
+        cls.objects.bulk_create(
+            [
+                cls(kind=kind, object_id=object_id, project_id=project_id, task_id=task_id, title=title, body=body)
+                for object_id, project_id, task_id, title, body in rows
+            ],
+            update_conflicts=True,
+            unique_fields=['kind', 'object_id'],
+            update_fields=['project', 'task', 'title', 'body', 'updated_at'],
+        )
+
+class Notification(TracksLoadedValuesMixin, models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='notifications')
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
     message = models.CharField(max_length=255)
+    # How many identical notifications this row stands for once
+    # prune_notifications has collapsed repeats into it.
+    count = models.PositiveIntegerField(default=1)
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Inbox pages, newest first.
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_created_idx'),
+            # Only unread rows are looked up by state, so keep the index to those.
+            models.Index(
+                fields=['user', 'is_read', 'created_at'], name='notification_unread_idx',
+                condition=Q(is_read=False),
+            ),
+        ]
+
+class ActivityType(models.TextChoices):
+    TASK_CREATED = 'task_created', 'Task created'
+    TASK_COMPLETED = 'task_completed', 'Task completed'
+    TASK_MISSED = 'task_missed', 'Task missed'
+    TASK_ASSIGNED = 'task_assigned', 'Task assigned'
+    TASK_UNASSIGNED = 'task_unassigned', 'Task unassigned'
+    TASK_DELETED = 'task_deleted', 'Task deleted'
+    EXPENSE_ADDED = 'expense_added', 'Expense added'
+    MEMBER_ADDED = 'member_added', 'Member added'
+    OTHER = 'other', 'Other'
+
+# Task events a task can have at most once.
+OUTCOME_EVENTS = [ActivityType.TASK_COMPLETED, ActivityType.TASK_MISSED]
+
+ACTIVITY_TEMPLATES = {
+    ActivityType.TASK_CREATED: "added task '{subject}'",
+    ActivityType.TASK_COMPLETED: "completed task '{subject}'",
+    ActivityType.TASK_MISSED: "missed due date for task '{subject}'",
+    ActivityType.TASK_ASSIGNED: "assigned {target} to task '{subject}'",
+    ActivityType.TASK_UNASSIGNED: "unassigned {target} from task '{subject}'",
+    ActivityType.TASK_DELETED: "deleted task '{subject}'",
+    ActivityType.EXPENSE_ADDED: "added an expense: {subject}",
+    ActivityType.MEMBER_ADDED: "added {target} to the team",
+}
+
+
+def render_activity(log):
+    """
+    Human-readable text of an activity row. Rows logged before event types
+    existed keep their text in ``action``; newer ones are rendered here.
+    Needs ``target_user`` loaded to avoid a query per row.
+    """
+    if log.action or log.event_type not in ACTIVITY_TEMPLATES:
+        return log.action
+    target = log.target_user.username if log.target_user_id else 'a removed user'
+    return ACTIVITY_TEMPLATES[log.event_type].format(subject=log.subject, target=target)
+
+
 class ActivityLog(models.Model):
     project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, related_name='activities')
     task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_logs')
+    # The actor.
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
-    action = models.CharField(max_length=255)
+    event_type = models.CharField(max_length=20, choices=ActivityType.choices, default=ActivityType.OTHER)
+    target_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Name of what was acted on (task title, expense), as it was at the time.
+    subject = models.CharField(max_length=255, blank=True)
+    # Free text for OTHER events and rows from before event_type; see render_activity.
+    action = models.CharField(max_length=255, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'timestamp', 'id'], name='activity_project_ts_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['task', 'event_type'], condition=Q(event_type__in=OUTCOME_EVENTS),
+                name='activity_task_outcome_uniq',
+            ),
+        ]
+
+    @classmethod
+    def bulk_record(cls, logs):
+        """
+        bulk_create for activity logs. It also refreshes ProjectStats
+        last_activity_at, which post_save would otherwise do.
+        """
+        logs = cls.objects.bulk_create(logs)
+        ActivityRollup.record(logs)
+        latest = {}
+        for log in logs:
+            if log.project_id and (log.project_id not in latest or log.timestamp > latest[log.project_id]):
+                latest[log.project_id] = log.timestamp
+        for project_id, timestamp in latest.items():
+            ProjectStats.objects.filter(project_id=project_id).update(last_activity_at=timestamp)
+        return logs
+
+    # Outcome checks read ActivityFeed, so an archived outcome still counts.
+    # The unique constraint only covers the live table, which is enough: a
+    # race can only happen while neither table has the event yet.
+
+    @classmethod
+    def has_outcome(cls, task_id, event_type):
+        return ActivityFeed.objects.filter(task_id=task_id, event_type=event_type).exists()
+
+    @classmethod
+    def logged_outcomes(cls, task_ids):
+        """(task_id, event_type) of the completed/missed events logged for ``task_ids``."""
+        return set(
+            ActivityFeed.objects.filter(task_id__in=task_ids, event_type__in=OUTCOME_EVENTS)
+            .values_list('task_id', 'event_type')
+        )
+
+    @classmethod
+    def record_outcome(cls, log):
+        """
+        Saves a completed/missed event, or returns None when the unique
+        constraint shows its task already has one.
+        """
+        try:
+            with transaction.atomic():
+                log.save()
+        except IntegrityError:
+            return None
+        return log
+
     def __str__(self):
-        return f"[{self.timestamp.strftime('%Y-%m-%d %H:%M')}] User {self.user.username if self.user else 'Unknown'} {self.action} in project {self.project.title if self.project else 'N/A'}"
+        return f"[{self.timestamp.strftime('%Y-%m-%d %H:%M')}] User {self.user.username if self.user else 'Unknown'} {render_activity(self)} in project {self.project.title if self.project else 'N/A'}"
+
+class ActivityRollup(models.Model):
+    """
+    Activity counts per project, user, day and type, kept current as logs
+    are written so charts never scan ActivityLog and survive archiving.
+    Keys are unique while the user exists; deleting users leaves rows that
+    share a key with a null user, so readers sum ``count``.
+    """
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    day = models.DateField()
+    action_type = models.CharField(max_length=20, choices=ActivityType.choices)
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'day'], name='activity_rollup_day_idx'),
+        ]
+        constraints = [
+            # NULLs are distinct, so rows of deleted users may still share a key.
+            models.UniqueConstraint(
+                fields=['project', 'user', 'day', 'action_type'], name='activity_rollup_key_uniq',
+            ),
+        ]
+
+    @classmethod
+    def record(cls, logs):
+        """Adds ``logs`` to the rollup with one UPDATE (or INSERT) per key."""
+        counts = Counter(
+            (log.project_id, log.user_id, timezone.localdate(log.timestamp), log.event_type)
+            for log in logs if log.project_id
+        )
+        for (project_id, user_id, day, action_type), count in counts.items():
+            key = dict(project_id=project_id, user_id=user_id, day=day, action_type=action_type)
+            rows = cls.objects.filter(**key)
+            if user_id is None:
+                # Not unique without a user; add to one of the rows.
+                rows = cls.objects.filter(pk__in=rows.values('pk')[:1])
+            if rows.update(count=F('count') + count):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(count=count, **key)
+            except IntegrityError:
+                # A concurrent writer inserted the key first; add to its row.
+                cls.objects.filter(**key).update(count=F('count') + count)
+
+class ArchivedActivityLog(models.Model):
+    """ActivityLog rows moved out of the live table by archive_activity, ids kept."""
+    id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(Project, on_delete=models.SET_NULL, null=True, related_name='+')
+    task = models.ForeignKey(Task, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='+')
+    event_type = models.CharField(max_length=20, choices=ActivityType.choices, default=ActivityType.OTHER)
+    target_user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    subject = models.CharField(max_length=255, blank=True)
+    action = models.CharField(max_length=255, blank=True)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project', 'timestamp', 'id'], name='activity_archive_ts_idx'),
+        ]
+
+class ActivityFeed(models.Model):
+    """
+    Read-only view over ActivityLog UNION ALL ArchivedActivityLog, so feeds
+    page through live and archived activity as one table. Migrations that
+    change either table must drop the view first and recreate it after.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    project = models.ForeignKey(Project, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+')
+    task = models.ForeignKey(Task, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+')
+    event_type = models.CharField(max_length=20, choices=ActivityType.choices)
+    target_user = models.ForeignKey(User, on_delete=models.DO_NOTHING, null=True, db_constraint=False, related_name='+')
+    subject = models.CharField(max_length=255)
+    action = models.CharField(max_length=255)
+    timestamp = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'api_activityfeed'
 # -----------------------
 # SIGNALS (AUTOMATION)
 # -----------------------
@@ -169,64 +645,156 @@ def save_user_profile(sender, instance, **kwargs):
 @receiver(post_save, sender=Task)
 def log_task_activity(sender, instance, created, **kwargs):
     if created:
-        action = f"added task '{instance.title}'"
-        user_to_log = instance.project.owner 
+        user_to_log = instance.project.owner
         if user_to_log:
-            ActivityLog.objects.create(project=instance.project, user=user_to_log, action=action, task=instance) 
+            ActivityLog.objects.create(
+                project=instance.project, user=user_to_log, task=instance,
+                event_type=ActivityType.TASK_CREATED, subject=instance.title,
+            )
+        else:
             print(f"Warning: No project owner found for project {instance.project.id} when logging task creation.")
 
-    elif instance.status == 'Done' and ActivityLog.objects.filter(task=instance, action__icontains='completed').count() == 0:
-        action = f"completed task '{instance.title}'"
-        user_to_log = instance.project.owner 
-        if instance.assigned_to.exists():
-            user_to_log = instance.assigned_to.first() 
+    elif instance.status == 'Done' and not ActivityLog.has_outcome(instance.id, ActivityType.TASK_COMPLETED):
+        user_to_log = instance.assigned_to.order_by('pk').first() or instance.project.owner
         if user_to_log:
-            ActivityLog.objects.create(project=instance.project, user=user_to_log, action=action, task=instance) 
+            ActivityLog.record_outcome(ActivityLog(
+                project=instance.project, user=user_to_log, task=instance,
+                event_type=ActivityType.TASK_COMPLETED, subject=instance.title,
+            ))
         else:
             print(f"Warning: No user to log completion for task {instance.id}.")
-    
-    elif instance.status == 'Missed' and ActivityLog.objects.filter(task=instance, action__icontains='missed').count() == 0:
-        action = f"missed due date for task '{instance.title}'"
+
+    elif instance.status == 'Missed' and not ActivityLog.has_outcome(instance.id, ActivityType.TASK_MISSED):
         user_to_log = instance.project.owner
         if user_to_log:
-            ActivityLog.objects.create(project=instance.project, user=user_to_log, action=action, task=instance) 
+            ActivityLog.record_outcome(ActivityLog(
+                project=instance.project, user=user_to_log, task=instance,
+                event_type=ActivityType.TASK_MISSED, subject=instance.title,
+            ))
         else:
             print(f"Warning: No user to log missed status for task {instance.id}.")
 
 
+def log_task_status_changes(tasks):
+    """
+    Batched counterpart of the Done/Missed branches of log_task_activity for
+    tasks written with bulk_update. Expects project__owner and assigned_to to
+    be loaded.
+    """
+    tasks = [task for task in tasks if task.status in ('Done', 'Missed')]
+    if not tasks:
+        return []
+    logged = ActivityLog.logged_outcomes([task.id for task in tasks])
+
+    logs = []
+    for task in tasks:
+        if task.status == 'Done':
+            event_type = ActivityType.TASK_COMPLETED
+            assignees = sorted(task.assigned_to.all(), key=lambda user: user.pk)
+            user_to_log = assignees[0] if assignees else task.project.owner
+        else:
+            event_type = ActivityType.TASK_MISSED
+            user_to_log = task.project.owner
+        if user_to_log and (task.id, event_type) not in logged:
+            logs.append(ActivityLog(
+                project=task.project, user=user_to_log, task=task,
+                event_type=event_type, subject=task.title,
+            ))
+    try:
+        with transaction.atomic():
+            return ActivityLog.bulk_record(logs)
+    except IntegrityError:
+        # A concurrent save logged some of these first; keep the rest.
+        return [log for log in logs if ActivityLog.record_outcome(log)]
+
+
+def delete_tasks(tasks):
+    """
+    Deletes ``tasks`` (instances) and applies the Task post_delete side
+    effects once for the batch instead of once per task. Cascades to
+    comments and attachments still run their own handlers.
+    """
+    tasks = list(tasks)
+    if not tasks:
+        return
+    changes = [(task.project_id, task.status, None, None) for task in tasks]
+    for task in tasks:
+        task._batched_delete = True
+    collector = Collector(using=router.db_for_write(Task))
+    collector.collect(tasks)
+    collector.delete()
+
+    ProjectStats.record_task_changes(changes)
+    # Task search documents cascade with their task.
+    invalidate_project_dashboards({project_id for project_id, _, _, _ in changes})
+
+
+def log_assignment_changes(changes):
+    """
+    Notifies and logs (un)assignments in bulk. ``changes`` holds
+    (task, event_type, user_ids) with event_type TASK_ASSIGNED or
+    TASK_UNASSIGNED; task.project.owner is expected to be loaded.
+    """
+    changes = [(task, event_type, user_ids) for task, event_type, user_ids in changes if user_ids]
+    if not changes:
+        return
+    users = User.objects.in_bulk({user_id for _, _, user_ids in changes for user_id in user_ids})
+
+    notifications, logs = [], []
+    for task, event_type, user_ids in changes:
+        project = task.project
+        if event_type == ActivityType.TASK_ASSIGNED:
+            message = f"You have been assigned to task: '{task.title}' in project '{project.title}'."
+        else:
+            message = f"You have been unassigned from task: '{task.title}' in project '{project.title}'."
+        targets = [users[user_id] for user_id in user_ids if user_id in users]
+        notifications += [Notification(user=user, task=task, message=message) for user in targets]
+        if project.owner:
+            logs += [
+                ActivityLog(
+                    project=project, user=project.owner, task=task,
+                    event_type=event_type, target_user=user, subject=task.title,
+                )
+                for user in targets
+            ]
+        else:
+            print(f"Warning: No project owner to log assignment changes for task {task.id}.")
+
+    notifications = Notification.objects.bulk_create(notifications)
+    # bulk_create skips post_save, so count and publish them here.
+    Profile.bump_unread(Counter(notification.user_id for notification in notifications))
+    transaction.on_commit(lambda: notification_broker.publish(notifications))
+    ActivityLog.bulk_record(logs)
+
+
 @receiver(m2m_changed, sender=Task.assigned_to.through)
 def create_assignment_notification_and_log(sender, instance, action, reverse, model, pk_set, **kwargs):
-    if action == 'post_add':
-        for user_pk in pk_set:
-            user = User.objects.get(pk=user_pk)
-            Notification.objects.create(
-                user=user,
-                message=f"You have been assigned to task: '{instance.title}' in project '{instance.project.title}'."
-            )
-          
-            if instance.project.owner:
-                ActivityLog.objects.create(
-                    project=instance.project,
-                    user=instance.project.owner,
-                    action=f"assigned {user.username} to task '{instance.title}'"
-                )
-            else:
-                print(f"Warning: No project owner to log assignment for task {instance.id}.")
-    elif action == 'post_remove':
-        for user_pk in pk_set:
-            user = User.objects.get(pk=user_pk)
-            Notification.objects.create(
-                user=user,
-                message=f"You have been unassigned from task: '{instance.title}' in project '{instance.project.title}'."
-            )
-            if instance.project.owner:
-                ActivityLog.objects.create(
-                    project=instance.project,
-                    user=instance.project.owner,
-                    action=f"unassigned {user.username} from task '{instance.title}'"
-                )
-            else:
-                print(f"Warning: No project owner to log unassignment for task {instance.id}.")
+    if action not in ('post_add', 'post_remove') or reverse or not pk_set:
+        return
+
+    instance.project = Project.objects.select_related('owner').get(pk=instance.project_id)
+    event_type = ActivityType.TASK_ASSIGNED if action == 'post_add' else ActivityType.TASK_UNASSIGNED
+    log_assignment_changes([(instance, event_type, pk_set)])
+
+
+@receiver(post_save, sender=Notification)
+def publish_notification(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: notification_broker.publish([instance]))
+
+
+@receiver(post_save, sender=Notification)
+def count_unread_notification(sender, instance, created, **kwargs):
+    was_unread = not created and not getattr(instance, '_loaded_values', {}).get('is_read', True)
+    delta = (not instance.is_read) - was_unread
+    Profile.bump_unread({instance.user_id: delta})
+    instance._loaded_values = {**getattr(instance, '_loaded_values', {}), 'is_read': instance.is_read}
+
+
+@receiver(post_delete, sender=Notification)
+def uncount_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        Profile.bump_unread({instance.user_id: -1})
 
 
 @receiver(post_save, sender=Expense)
@@ -234,8 +802,9 @@ def log_expense_activity(sender, instance, created, **kwargs):
     if created:
         ActivityLog.objects.create(
             project=instance.project,
-            user=instance.project.owner, 
-            action=f"added an expense: ${instance.amount} ({instance.description})"
+            user=instance.project.owner,
+            event_type=ActivityType.EXPENSE_ADDED,
+            subject=f"${instance.amount} ({instance.description})"[:255],
         )
 
 @receiver(post_save, sender=TeamMember)
@@ -243,6 +812,244 @@ def log_team_activity(sender, instance, created, **kwargs):
     if created:
         ActivityLog.objects.create(
             project=instance.project,
-            user=instance.project.owner, 
-            action=f"added {instance.user.username} to the team"
-        )
\ No newline at end of file
+            user=instance.project.owner,
+            event_type=ActivityType.MEMBER_ADDED,
+            target_user=instance.user,
+        )
+
+
+# -----------------------
+# PROJECT STATS ROLLUP
+# -----------------------
+
+@receiver(post_save, sender=Project)
+def create_project_stats(sender, instance, created, **kwargs):
+    if created:
+        ProjectStats.objects.get_or_create(project=instance)
+    else:
+        ProjectStats.bump(instance.id, version=1)
+
+@receiver(post_save, sender=Task)
+def update_stats_on_task_save(sender, instance, created, **kwargs):
+    if created:
+        ProjectStats.bump(instance.project_id, version=1, **ProjectStats.task_deltas(instance.status, 1))
+    else:
+        loaded = getattr(instance, '_loaded_values', {})
+        old_status = loaded.get('status', instance.status)
+        old_project_id = loaded.get('project_id', instance.project_id)
+        if old_status != instance.status or old_project_id != instance.project_id:
+            ProjectStats.bump(old_project_id, version=1, **ProjectStats.task_deltas(old_status, -1))
+            ProjectStats.bump(instance.project_id, version=1, **ProjectStats.task_deltas(instance.status, 1))
+        else:
+            ProjectStats.bump(instance.project_id, version=1)
+    instance._loaded_values = {'status': instance.status, 'project_id': instance.project_id}
+
+@receiver(post_delete, sender=Task)
+def update_stats_on_task_delete(sender, instance, **kwargs):
+    if getattr(instance, '_batched_delete', False):
+        return
+    ProjectStats.bump(instance.project_id, version=1, **ProjectStats.task_deltas(instance.status, -1))
+
+@receiver(post_save, sender=Expense)
+def update_stats_on_expense_save(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    if created:
+        ProjectStats.bump(instance.project_id, expense_total=instance.amount)
+    elif loaded.get('project_id', instance.project_id) != instance.project_id:
+        ProjectStats.bump(loaded['project_id'], expense_total=-loaded.get('amount', instance.amount))
+        ProjectStats.bump(instance.project_id, expense_total=instance.amount)
+    else:
+        ProjectStats.bump(instance.project_id, expense_total=instance.amount - loaded.get('amount', instance.amount))
+    instance._loaded_values = {'amount': instance.amount, 'project_id': instance.project_id}
+
+@receiver(post_delete, sender=Expense)
+def update_stats_on_expense_delete(sender, instance, **kwargs):
+    ProjectStats.bump(instance.project_id, expense_total=-instance.amount)
+
+@receiver(post_save, sender=TeamMember)
+def update_stats_on_member_save(sender, instance, created, **kwargs):
+    ProjectStats.bump(instance.project_id, version=1, member_count=1 if created else 0)
+
+@receiver(post_delete, sender=TeamMember)
+def update_stats_on_member_delete(sender, instance, **kwargs):
+    ProjectStats.bump(instance.project_id, version=1, member_count=-1)
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def update_stats_on_assignment(sender, instance, action, reverse, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear') and not reverse:
+        ProjectStats.bump(instance.project_id, version=1)
+
+@receiver(post_save, sender=Attachment)
+@receiver(post_delete, sender=Attachment)
+def update_stats_on_attachment_change(sender, instance, **kwargs):
+    # Attachments are embedded in task lists, so they count as a change.
+    ProjectStats.objects.filter(project__tasks=instance.task_id).update(version=F('version') + 1)
+
+@receiver(post_save, sender=ActivityLog)
+def update_stats_on_activity(sender, instance, created, **kwargs):
+    if created and instance.project_id:
+        ProjectStats.objects.filter(project_id=instance.project_id).update(
+            last_activity_at=instance.timestamp
+        )
+
+@receiver(post_save, sender=ActivityLog)
+def update_activity_rollup(sender, instance, created, **kwargs):
+    if created:
+        ActivityRollup.record([instance])
+
+
+# -----------------------
+# DASHBOARD CACHE INVALIDATION
+# -----------------------
+
+@receiver(post_save, sender=Task)
+def invalidate_dashboards_on_task_save(sender, instance, **kwargs):
+    invalidate_project_dashboards([instance.project_id])
+    invalidate_dashboards(instance.assigned_to.values_list('id', flat=True))
+
+@receiver(post_delete, sender=Task)
+def invalidate_dashboards_on_task_delete(sender, instance, **kwargs):
+    if getattr(instance, '_batched_delete', False):
+        return
+    invalidate_project_dashboards([instance.project_id])
+
+@receiver(m2m_changed, sender=Task.assigned_to.through)
+def invalidate_dashboards_on_assignment(sender, instance, action, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove') and pk_set:
+        invalidate_dashboards(pk_set)
+    elif action == 'post_clear':
+        invalidate_project_dashboards([instance.project_id])
+
+@receiver(post_save, sender=Project)
+def invalidate_dashboards_on_project_save(sender, instance, **kwargs):
+    invalidate_project_dashboards([instance.id])
+
+@receiver(pre_delete, sender=Project)
+def invalidate_dashboards_on_project_delete(sender, instance, **kwargs):
+    # Members are cascaded away with the project, so collect them up front.
+    user_ids = [instance.owner_id]
+    user_ids += instance.team_members.values_list('user_id', flat=True)
+    transaction.on_commit(lambda: invalidate_dashboards(user_ids))
+
+@receiver(post_save, sender=TeamMember)
+@receiver(post_delete, sender=TeamMember)
+def invalidate_dashboards_on_member_change(sender, instance, **kwargs):
+    invalidate_project_dashboards([instance.project_id])
+    invalidate_dashboards([instance.user_id])
+
+@receiver(post_save, sender=Expense)
+@receiver(post_delete, sender=Expense)
+def invalidate_dashboards_on_expense_change(sender, instance, **kwargs):
+    invalidate_project_dashboards([instance.project_id])
+
+
+# -----------------------
+# PROJECT ACCESS INDEX INVALIDATION
+# -----------------------
+
+@receiver(post_save, sender=Project)
+def invalidate_access_on_project_save(sender, instance, created, **kwargs):
+    old_owner_id = getattr(instance, '_loaded_values', {}).get('owner_id', instance.owner_id)
+    if created or old_owner_id != instance.owner_id:
+        invalidate_project_access({old_owner_id, instance.owner_id})
+    instance._loaded_values = {'owner_id': instance.owner_id}
+
+@receiver(post_delete, sender=Project)
+def invalidate_access_on_project_delete(sender, instance, **kwargs):
+    # Members are covered by the cascaded TeamMember deletes.
+    invalidate_project_access([instance.owner_id])
+
+@receiver(post_save, sender=TeamMember)
+def invalidate_access_on_member_save(sender, instance, created, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    old_user_id = loaded.get('user_id', instance.user_id)
+    if created or old_user_id != instance.user_id or loaded.get('project_id', instance.project_id) != instance.project_id:
+        invalidate_project_access({old_user_id, instance.user_id})
+    instance._loaded_values = {'user_id': instance.user_id, 'project_id': instance.project_id}
+
+@receiver(post_delete, sender=TeamMember)
+def invalidate_access_on_member_delete(sender, instance, **kwargs):
+    invalidate_project_access([instance.user_id])
+
+
+# -----------------------
+# CHUNKED UPLOADS
+# -----------------------
+
+@receiver(post_delete, sender=UploadSession)
+def remove_upload_temp_file(sender, instance, **kwargs):
+    # Finalized sessions have already moved their file into storage.
+    path = instance.temp_path
+
+    def remove():
+        with suppress(FileNotFoundError):
+            os.remove(path)
+
+    transaction.on_commit(remove)
+
+
+# -----------------------
+# ATTACHMENT BLOB REFERENCE COUNTS
+# -----------------------
+
+@receiver(post_save, sender=Attachment)
+def count_blob_reference(sender, instance, created, **kwargs):
+    if created and instance.blob_id:
+        AttachmentBlob.objects.filter(pk=instance.blob_id).update(ref_count=F('ref_count') + 1)
+
+@receiver(post_delete, sender=Attachment)
+def release_blob_reference(sender, instance, **kwargs):
+    if instance.blob_id:
+        AttachmentBlob.objects.filter(pk=instance.blob_id, ref_count__gt=0).update(ref_count=F('ref_count') - 1)
+
+
+# -----------------------
+# IMAGE THUMBNAILS
+# -----------------------
+
+@receiver(pre_save, sender=Profile)
+def reset_picture_variants(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    if loaded.get('profile_picture', instance.profile_picture.name) != instance.profile_picture.name:
+        instance.picture_variants = None
+
+@receiver(post_save, sender=Profile)
+def render_picture_variants(sender, instance, **kwargs):
+    if instance.profile_picture and instance.picture_variants is None:
+        schedule_thumbnails(generate_profile_variants, instance.pk)
+    instance._loaded_values = {'profile_picture': instance.profile_picture.name}
+
+@receiver(post_save, sender=AttachmentBlob)
+def render_blob_variants(sender, instance, created, **kwargs):
+    if created and instance.content_type.startswith('image/'):
+        schedule_thumbnails(generate_blob_variants, instance.pk)
+
+
+# -----------------------
+# SEARCH INDEX
+# -----------------------
+
+@receiver(post_save, sender=Project)
+def index_project(sender, instance, **kwargs):
+    SearchDocument.index_projects([instance])
+
+@receiver(post_save, sender=Task)
+def index_task(sender, instance, created, **kwargs):
+    SearchDocument.index_tasks([instance])
+    if not created:
+        # Keep the task's comments filed under the project it now belongs to.
+        SearchDocument.objects.filter(kind='comment', task=instance).exclude(
+            project_id=instance.project_id
+        ).update(project_id=instance.project_id)
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    SearchDocument.index_comments([instance])
+
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Task)
+@receiver(post_delete, sender=Comment)
+def unindex_object(sender, instance, **kwargs):
+    if getattr(instance, '_batched_delete', False):
+        return
+    SearchDocument.objects.filter(kind=sender._meta.model_name, object_id=instance.pk).delete()
@@ -0,0 +1,28 @@
+from rest_framework.pagination import CursorPagination
+
+
+class ActivityLogCursorPagination(CursorPagination):
+    """
+    Keyset pagination over (timestamp, id), newest first. Each page is an
+    index range scan, so page N costs the same as page 1.
+    """
+    ordering = ('-timestamp', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class CommentCursorPagination(CursorPagination):
+    """Keyset pagination over (created_at, id), oldest first, for comment threads."""
+    ordering = ('created_at', 'id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class NotificationCursorPagination(CursorPagination):
+    """Keyset pagination over (created_at, id), newest first, for a user's inbox."""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
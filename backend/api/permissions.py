@@ -1,5 +1,7 @@
 from rest_framework import permissions
 
+from .access import get_project_access
+
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
     Custom permission to only allow owners of an object to edit it.
@@ -7,7 +9,7 @@ class IsOwnerOrReadOnly(permissions.BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in permissions.SAFE_METHODS:
             return True
-        return obj.owner == request.user
+        return obj.owner_id == request.user.id
 
     def has_permission(self, request, view):
         if request.method == 'POST':
@@ -19,14 +21,5 @@ class IsTeamMemberOrOwner(permissions.BasePermission):
     Ensures the user is the owner OR a team member of the project.
     """
     def has_object_permission(self, request, view, obj):
-        user = request.user
-        
-        if hasattr(obj, 'owner') and obj.owner == user:
-            return True
-        if hasattr(obj, 'project') and obj.project.owner == user:
-            return True
-        
-
-        project = obj if hasattr(obj, 'owner') else obj.project
-        
-        return project.team_members.filter(user=user).exists()
\ No newline at end of file
+        project_id = obj.pk if hasattr(obj, 'owner') else obj.project_id
+        return get_project_access(request).can_access(project_id)
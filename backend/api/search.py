@@ -0,0 +1,80 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import SearchDocument
+
+MAX_TERMS = 8
+TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# Title matches count for more than body matches on every backend.
+SQLITE_SEARCH = """
+    SELECT d.id, bm25(api_searchdocument_fts, 10.0, 1.0) AS rank
+    FROM api_searchdocument_fts
+    JOIN api_searchdocument d ON d.id = api_searchdocument_fts.rowid
+    WHERE api_searchdocument_fts MATCH %s AND d.project_id IN ({placeholders})
+    ORDER BY rank
+    LIMIT %s
+"""
+
+POSTGRES_SEARCH = """
+    SELECT id, ts_rank(search_vector, query) AS rank
+    FROM api_searchdocument, to_tsquery('simple', %s) query
+    WHERE search_vector @@ query AND project_id = ANY(%s)
+    ORDER BY rank DESC
+    LIMIT %s
+"""
+
+
+def search_terms(text):
+    return TERM_RE.findall(text.lower())[:MAX_TERMS]
+
+
+def search_documents(text, project_ids, limit):
+    """
+    Returns up to ``limit`` SearchDocuments in ``project_ids`` matching every
+    term of ``text`` (the last one as a prefix), best match first.
+    """
+    terms = search_terms(text)
+    project_ids = list(project_ids)
+    if not terms or not project_ids:
+        return []
+
+    if connection.vendor == 'sqlite' and _has_fts_table():
+        query = ' '.join(f'"{term}"' for term in terms) + '*'
+        placeholders = ', '.join(['%s'] * len(project_ids))
+        rows = _fetch(SQLITE_SEARCH.format(placeholders=placeholders), [query, *project_ids, limit])
+    elif connection.vendor == 'postgresql':
+        query = ' & '.join(terms) + ':*'
+        rows = _fetch(POSTGRES_SEARCH, [query, project_ids, limit])
+    else:
+        return _search_without_index(terms, project_ids, limit)
+
+    documents = SearchDocument.objects.in_bulk([row[0] for row in rows])
+    return [documents[pk] for pk, _ in rows if pk in documents]
+
+
+def _fetch(sql, params):
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+_fts_tables = {}
+
+
+def _has_fts_table():
+    # FTS5 may be missing from the SQLite build, in which case the migration
+    # fails loudly; this only guards databases created without it.
+    if connection.alias not in _fts_tables:
+        _fts_tables[connection.alias] = 'api_searchdocument_fts' in connection.introspection.table_names()
+    return _fts_tables[connection.alias]
+
+
+def _search_without_index(terms, project_ids, limit):
+    # Unranked scan for backends without a full-text index.
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(body__icontains=term)
+    return list(SearchDocument.objects.filter(condition, project_id__in=project_ids).order_by('-updated_at')[:limit])
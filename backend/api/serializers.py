@@ -1,7 +1,18 @@
+import mimetypes
+import os
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.utils.text import get_valid_filename
 from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
 from django.contrib.auth.models import User
+from django.db.models import Q, Count
 from rest_framework.fields import CurrentUserDefault
-from .models import Project, Task, TeamMember, Comment, Attachment, Profile, Expense, Notification, ActivityLog
+from .downloads import sign_file_url
+from .thumbnails import pick_variant
+from .models import Project, Task, TeamMember, Comment, Attachment, Profile, Expense, Notification, ActivityLog, ProjectStats, UploadSession, render_activity
 
 class ProfilePictureSerializer(serializers.ModelSerializer):
     class Meta:
@@ -9,21 +20,32 @@ class ProfilePictureSerializer(serializers.ModelSerializer):
         fields = ['profile_picture']
 
 # ✅ NEW: Separate ProfileSerializer for nested profile data
+def profile_picture_url(profile, label, request=None):
+    """URL of the ``label`` thumbnail of a profile picture, or the original until it is rendered."""
+    if not profile.profile_picture:
+        return None
+    url = default_storage.url(pick_variant(profile.profile_picture.name, profile.picture_variants, label))
+    return request.build_absolute_uri(url) if request else url
+
 class ProfileSerializer(serializers.ModelSerializer):
     """Serializer for Profile model with proper profile picture URL"""
     profile_picture = serializers.SerializerMethodField()
+    profile_picture_variants = serializers.SerializerMethodField()
     
     class Meta:
         model = Profile
-        fields = ['role', 'course', 'bio', 'profile_picture']
+        fields = ['role', 'course', 'bio', 'profile_picture', 'profile_picture_variants']
     
     def get_profile_picture(self, obj):
-        if obj.profile_picture:
-            request = self.context.get('request')
-            if request:
-                return request.build_absolute_uri(obj.profile_picture.url)
-            return obj.profile_picture.url
-        return None
+        return profile_picture_url(obj, 'md', self.context.get('request'))
+
+    def get_profile_picture_variants(self, obj):
+        if not obj.profile_picture:
+            return None
+        request = self.context.get('request')
+        urls = {label: profile_picture_url(obj, label, request) for label in ('sm', 'md')}
+        urls['original'] = request.build_absolute_uri(obj.profile_picture.url) if request else obj.profile_picture.url
+        return urls
 
 # ✅ UPDATED: CustomUserSerializer now uses nested ProfileSerializer
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -38,18 +60,110 @@ class CustomUserSerializer(serializers.ModelSerializer):
         user = User.objects.create_user(**validated_data)
         return user
 
+def attachment_download_url(attachment):
+    """A short-lived signed URL for the attachment's file."""
+    filename = attachment.filename or os.path.basename(attachment.file.name)
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    return sign_file_url(attachment.file.name, filename, content_type)
+
 class AttachmentSerializer(serializers.ModelSerializer):
     uploaded_by_username = serializers.ReadOnlyField(source='uploaded_by.username')
-    file_url = serializers.FileField(source='file', read_only=True)
+    file_url = serializers.SerializerMethodField()
+    thumbnail_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = Attachment
         fields = '__all__' 
-        read_only_fields = ['uploaded_by', 'uploaded_at']
+        read_only_fields = ['uploaded_by', 'uploaded_at', 'blob', 'filename']
+        # Files are only reachable through signed URLs.
+        extra_kwargs = {'file': {'write_only': True}}
+
+    def get_file_url(self, obj):
+        url = attachment_download_url(obj)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_thumbnail_urls(self, obj):
+        variants = obj.blob.variants if obj.blob_id else None
+        if not variants:
+            return None
+        request = self.context.get('request')
+        urls = {}
+        for label, name in variants.items():
+            url = sign_file_url(name, '', mimetypes.guess_type(name)[0] or 'application/octet-stream')
+            urls[label] = request.build_absolute_uri(url) if request else url
+        return urls
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'task', 'filename', 'size', 'received', 'created_at']
+        read_only_fields = ['received', 'created_at']
+
+    def validate_filename(self, value):
+        try:
+            return get_valid_filename(os.path.basename(value))
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("Invalid file name.")
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.MAX_ATTACHMENT_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.MAX_ATTACHMENT_SIZE} bytes.")
+        return value
+
+class SparseFieldsetMixin:
+    """
+    Honours ``?fields=a,b`` (on reads) and ``?expand=x,y``. Nested fields
+    listed in Meta.expandable_fields are left out unless expanded.
+    """
+
+    @classmethod
+    def requested_fields(cls, request):
+        """Returns (fields, expand); fields is None when unrestricted."""
+        def param(name):
+            value = request.query_params.get(name) if request is not None else None
+            if value is None:
+                return None
+            return {part.strip() for part in value.split(',') if part.strip()}
+
+        fields = param('fields') if request is not None and request.method in SAFE_METHODS else None
+        return fields, param('expand') or set()
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields, expand = self.requested_fields(self.context.get('request'))
+        for name in getattr(self.Meta, 'expandable_fields', ()):
+            if name not in expand:
+                self.fields.pop(name, None)
+        if fields is not None:
+            for name in set(self.fields) - fields - expand - {'id'}:
+                self.fields.pop(name)
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Looks ids up in ``context['preloaded'][model]`` ({pk: instance}) when the
+    view has fetched them in advance, so validating many items costs no
+    query per item. Falls back to the queryset otherwise.
+    """
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+class TaskSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    serializer_related_field = PreloadedPrimaryKeyRelatedField
 
-class TaskSerializer(serializers.ModelSerializer):
     assigned_to_details = CustomUserSerializer(source='assigned_to', many=True, read_only=True)
-    project_owner_id = serializers.ReadOnlyField(source='project.owner.id')
+    project_owner_id = serializers.ReadOnlyField(source='project.owner_id')
     attachments = AttachmentSerializer(many=True, read_only=True)
 
     class Meta:
@@ -60,10 +174,12 @@ class TaskSerializer(serializers.ModelSerializer):
             'created_at', 'updated_at', 'project_owner_id', 'attachments'
         ]
         read_only_fields = ['created_at', 'updated_at', 'project_owner_id', 'attachments']
+        expandable_fields = ['assigned_to_details', 'attachments']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     owner_username = serializers.ReadOnlyField(source='owner.username')
     progress = serializers.SerializerMethodField()
+    task_counts = serializers.SerializerMethodField()
     
     member_ids = serializers.ListField(
         child=serializers.IntegerField(), 
@@ -86,14 +202,39 @@ class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
         fields = '__all__' 
-        read_only_fields = ['owner_username', 'created_at', 'progress'] 
+        read_only_fields = ['owner_username', 'created_at', 'progress', 'task_counts'] 
+        expandable_fields = ['team_members']
+
+    def _get_task_counts(self, obj):
+        # Counts come from the ProjectStats rollup row; a single aggregate is
+        # only needed for projects whose row has not been built yet.
+        try:
+            stats = obj.stats
+        except ProjectStats.DoesNotExist:
+            stats = obj.tasks.aggregate(
+                total_tasks=Count('id'),
+                done_tasks=Count('id', filter=Q(status='Done')),
+                in_progress_tasks=Count('id', filter=Q(status='In Progress')),
+                pending_tasks=Count('id', filter=Q(status='Pending')),
+                missed_tasks=Count('id', filter=Q(status='Missed')),
+            )
+            stats = ProjectStats(project=obj, **stats)
+        return {
+            'total': stats.total_tasks,
+            'done': stats.done_tasks,
+            'in_progress': stats.in_progress_tasks,
+            'pending': stats.pending_tasks,
+            'missed': stats.missed_tasks,
+        }
+
+    def get_task_counts(self, obj):
+        return self._get_task_counts(obj)
 
     def get_progress(self, obj):
-        total_tasks = obj.tasks.count()
-        if total_tasks == 0:
+        counts = self._get_task_counts(obj)
+        if counts['total'] == 0:
             return 0
-        completed_tasks = obj.tasks.filter(status='Done').count()
-        return round((completed_tasks / total_tasks) * 100)
+        return round((counts['done'] / counts['total']) * 100)
 
     def get_team_members(self, obj):
         members = obj.team_members.all()
@@ -157,8 +298,8 @@ class CommentSerializer(serializers.ModelSerializer):
 
     def get_author_profile_picture(self, obj):
         try:
-            if hasattr(obj.author, 'profile') and obj.author.profile.profile_picture:
-                return obj.author.profile.profile_picture.url
+            if hasattr(obj.author, 'profile'):
+                return profile_picture_url(obj.author.profile, 'sm')
         except Exception:
             pass
         return None
@@ -173,14 +314,19 @@ class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
         fields = '__all__'
-        read_only_fields = ['user', 'created_at']
+        read_only_fields = ['user', 'task', 'count', 'created_at']
 
 class ActivityLogSerializer(serializers.ModelSerializer):
     username = serializers.ReadOnlyField(source='user.username')
+    target_username = serializers.ReadOnlyField(source='target_user.username')
     project_title = serializers.ReadOnlyField(source='project.title')
     task_title = serializers.ReadOnlyField(source='task.title')
+    action = serializers.SerializerMethodField()
 
     class Meta:
         model = ActivityLog
         fields = '__all__'
-        read_only_fields = ['timestamp', 'user', 'project', 'task']
\ No newline at end of file
+        read_only_fields = ['timestamp', 'user', 'project', 'task', 'event_type', 'target_user', 'subject']
+
+    def get_action(self, obj):
+        return render_activity(obj)
\ No newline at end of file
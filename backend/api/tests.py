@@ -1,3 +1,1131 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import re
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Max, QuerySet
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import ExifTags, Image
+from rest_framework.test import APITestCase
+
+from .access import ProjectAccess
+from .caching import PROJECT_ACCESS_KEY, get_dashboard_cache_key
+from .downloads import signing_window
+from .events import notification_broker
+from .management.commands.benchmark_analytics import Command as BenchmarkAnalyticsCommand
+from .management.commands.mark_missed_tasks import OPEN_STATUSES
+from .management.commands.prune_notifications import Command as PruneNotificationsCommand
+from .models import (
+    ActivityFeed, ActivityLog, ActivityRollup, ActivityType, ArchivedActivityLog, Attachment, AttachmentBlob,
+    Comment, Expense, Notification, Profile, Project, ProjectStats, SearchDocument, Task, TeamMember,
+    render_activity,
+)
+from .serializers import ProfileSerializer, attachment_download_url
+from .thumbnails import render_variants
+from .views import UploadSessionView, _notification_events
+
+
+class APITestBase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user('owner', 'owner@example.com', 'pw')
+        self.member = User.objects.create_user('member', 'member@example.com', 'pw')
+        self.client.force_authenticate(self.owner)
+
+    def make_project(self, n_tasks=3, project_type='Collaborative', owner=None, title='Project'):
+        owner = owner or self.owner
+        project = Project.objects.create(owner=owner, title=title, project_type=project_type)
+        TeamMember.objects.create(project=project, user=owner, role='Owner')
+        if owner != self.member:
+            TeamMember.objects.create(project=project, user=self.member)
+        for i in range(n_tasks):
+            Task.objects.create(project=project, title=f'Task {i}', status='Done' if i % 2 else 'Pending')
+        return project
+
+
+# ---------------------------------------------------------
+# BULK TASK OPERATIONS
+# ---------------------------------------------------------
+
+class TaskBulkTests(APITestBase):
+    def test_rejects_a_body_that_is_not_an_object(self):
+        for body in (["x"], "x", 3):
+            response = self.client.post('/api/tasks/bulk/', body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+
+    def test_dashboards_are_invalidated_after_commit(self):
+        project = self.make_project(2)
+        pending = project.tasks.get(status='Pending')
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(
+                '/api/tasks/bulk/', {'update': [{'id': pending.id, 'status': 'Done'}]}, format='json',
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+
+        # What a concurrent dashboard read could cache before the commit.
+        cache.set(get_dashboard_cache_key(self.owner.id), {'stale': True})
+        for callback in callbacks:
+            callback()
+        self.assertNotIn('stale', self.client.get('/api/dashboard-stats/').data)
+
+    def bulk_queries(self, body):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/tasks/bulk/', body, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_items(self):
+        users = [self.owner, self.member]
+        counts = {}
+        for n in (1, 10):
+            # A fresh project each time, so both sizes start without rollup rows.
+            project = self.make_project(0, title=f'Project {n}')
+            ProjectAccess.load(self.owner)
+            created = self.bulk_queries({'create': [
+                {'project': project.id, 'title': f'Task {i}', 'assigned_to': [user.id for user in users]}
+                for i in range(n)
+            ]})
+            ids = list(project.tasks.values_list('id', flat=True))
+            updated = self.bulk_queries({'update': [
+                {'id': pk, 'status': 'Done', 'assigned_to': [self.member.id]} for pk in ids
+            ]})
+            deleted = self.bulk_queries({'delete': ids})
+            counts[n] = (created, updated, deleted)
+        self.assertEqual(counts[1], counts[10])
+
+    def test_assignments_are_notified_and_logged(self):
+        project = self.make_project(0)
+        response = self.client.post('/api/tasks/bulk/', {'create': [
+            {'project': project.id, 'title': f'Task {i}', 'assigned_to': [self.member.id]} for i in range(3)
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        task_ids = [task['id'] for task in response.data['created']]
+        self.assertEqual(Notification.objects.filter(user=self.member, task__in=task_ids).count(), 3)
+        self.assertEqual(Profile.objects.get(user=self.member).unread_notifications, 3)
+        self.assertEqual(
+            ActivityLog.objects.filter(event_type=ActivityType.TASK_ASSIGNED, target_user=self.member).count(), 3
+        )
+
+        # Reassigning and completing in one item credits the new assignee.
+        response = self.client.post('/api/tasks/bulk/', {'update': [
+            {'id': task_ids[0], 'status': 'Done', 'assigned_to': [self.owner.id]},
+        ]}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(list(Task.objects.get(id=task_ids[0]).assigned_to.all()), [self.owner])
+        self.assertTrue(ActivityLog.objects.filter(
+            event_type=ActivityType.TASK_UNASSIGNED, task=task_ids[0], target_user=self.member,
+        ).exists())
+        completed = ActivityLog.objects.get(event_type=ActivityType.TASK_COMPLETED, task=task_ids[0])
+        self.assertEqual(completed.user, self.owner)
+
+    def test_delete_updates_stats_and_search(self):
+        project = self.make_project(4)
+        ids = list(project.tasks.values_list('id', flat=True)[:3])
+        response = self.client.post('/api/tasks/bulk/', {'delete': ids}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        stats = ProjectStats.objects.get(project=project)
+        self.assertEqual(stats.total_tasks, 1)
+        self.assertEqual(stats.total_tasks, stats.done_tasks + stats.pending_tasks)
+        self.assertFalse(SearchDocument.objects.filter(kind='task', object_id__in=ids).exists())
+
+    def test_rejects_unknown_related_ids(self):
+        project = self.make_project(0)
+        for assigned_to in ([999], ['x'], [True]):
+            response = self.client.post('/api/tasks/bulk/', {'create': [
+                {'project': project.id, 'title': 'Task', 'assigned_to': assigned_to},
+            ]}, format='json')
+            self.assertEqual(response.status_code, 400, assigned_to)
+        response = self.client.post('/api/tasks/bulk/', {'create': [{'project': 999, 'title': 'Task'}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------------------------------------------------------
+# NOTIFICATIONS
+# ---------------------------------------------------------
+
+class NotificationMarkReadTests(APITestBase):
+    def test_rejects_a_body_that_is_not_an_object(self):
+        response = self.client.post('/api/notifications/mark-read/', [1, 2], format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_marks_a_range_and_updates_the_counter(self):
+        notifications = [Notification.objects.create(user=self.owner, message=f'Note {i}') for i in range(3)]
+        response = self.client.post(
+            '/api/notifications/mark-read/',
+            {'from_id': notifications[0].id, 'to_id': notifications[1].id}, format='json',
+        )
+        self.assertEqual(response.data, {'marked': 2, 'unread': 1})
+
+
+@mock.patch('api.views.NOTIFICATION_STREAM_KEEPALIVE', 0.05)
+class NotificationStreamTests(APITestBase):
+    async def next_event(self, events):
+        return await asyncio.wait_for(anext(events), 5)
+
+    async def notification_ids(self, events, n):
+        """Ids of the next ``n`` notification events, giving up after a few keep-alives."""
+        ids = []
+        for _ in range(n + 10):
+            event = await self.next_event(events)
+            if event.startswith('id: '):
+                ids.append(int(event.split('\n')[0][4:]))
+            if len(ids) == n:
+                break
+        return ids
+
+    def notify(self, n):
+        # Created without the post-commit publish, as by another worker.
+        return [Notification.objects.create(user=self.member, message=f'Note {i}') for i in range(n)]
+
+    async def test_resumes_after_last_event_id(self):
+        notifications = await sync_to_async(self.notify)(3)
+        events = _notification_events(self.member.id, notifications[0].id)
+        try:
+            self.assertTrue((await self.next_event(events)).startswith('retry: '))
+            self.assertEqual(await self.notification_ids(events, 2), [n.id for n in notifications[1:]])
+        finally:
+            await events.aclose()
+
+    async def test_picks_up_notifications_from_other_workers(self):
+        events = _notification_events(self.member.id, None)
+        try:
+            await self.next_event(events)
+            self.assertEqual(await self.next_event(events), ': keep-alive\n\n')
+            notifications = await sync_to_async(self.notify)(2)
+            self.assertEqual(await self.notification_ids(events, 2), [n.id for n in notifications])
+        finally:
+            await events.aclose()
+
+    async def test_wake_up_sends_everything_newer_from_the_database(self):
+        events = _notification_events(self.member.id, None)
+        try:
+            await self.next_event(events)
+            notifications = await sync_to_async(self.notify)(3)
+            # Only the last one reaches this worker's broker.
+            notification_broker.publish(notifications[-1:])
+            self.assertEqual(await self.notification_ids(events, 3), [n.id for n in notifications])
+        finally:
+            await events.aclose()
+
+    def test_requires_a_valid_token(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/notifications/stream/').status_code, 401)
+        self.assertEqual(self.client.get('/api/notifications/stream/', {'token': 'x'}).status_code, 401)
+
+
+# ---------------------------------------------------------
+# TASK QUERY COUNTS
+# ---------------------------------------------------------
+
+class TaskQueryCountTests(APITestBase):
+    """
+    Pins the queries each task verb costs with the access index cached, so
+    a new per-row lookup or signal shows up as a failing count.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_project(3)
+        self.task = self.project.tasks.get(title='Task 0')
+        self.task.assigned_to.add(self.member)
+        ProjectAccess.load(self.owner)
+
+    def test_list(self):
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/tasks/', {'project': self.project.id})
+        self.assertEqual(len(response.data), 3)
+
+    def test_list_does_not_grow_with_tasks(self):
+        for i in range(10):
+            Task.objects.create(project=self.project, title=f'Extra {i}').assigned_to.add(self.owner, self.member)
+        with self.assertNumQueries(4):
+            self.client.get('/api/tasks/', {'project': self.project.id})
+
+    def test_retrieve(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/tasks/{self.task.id}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_create(self):
+        with self.assertNumQueries(13):
+            response = self.client.post('/api/tasks/', {'project': self.project.id, 'title': 'New'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+
+    def test_partial_update(self):
+        with self.assertNumQueries(22):
+            response = self.client.patch(f'/api/tasks/{self.task.id}/', {'status': 'Done'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_update(self):
+        body = {'project': self.project.id, 'title': 'Renamed', 'status': 'Pending'}
+        with self.assertNumQueries(12):
+            response = self.client.put(f'/api/tasks/{self.task.id}/', body, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+
+    def test_delete(self):
+        with self.assertNumQueries(22):
+            response = self.client.delete(f'/api/tasks/{self.task.id}/')
+        self.assertEqual(response.status_code, 204)
+
+
+class ProjectListQueryCountTests(APITestBase):
+    def assert_list_queries(self, num, params=None):
+        for n in (1, 5):
+            while Project.objects.count() < n:
+                self.make_project(2, title=f'Project {Project.objects.count()}')
+            ProjectAccess.load(self.owner)
+            with self.assertNumQueries(num):
+                response = self.client.get('/api/projects/', params)
+            self.assertEqual(len(response.data), n)
+
+    def test_list_does_not_grow_with_projects(self):
+        self.assert_list_queries(3)
+
+    def test_expanded_members_do_not_grow_with_projects(self):
+        self.assert_list_queries(6, {'expand': 'team_members'})
+
+
+class AssignmentQueryCountTests(APITestBase):
+    def test_cost_does_not_grow_with_assignees(self):
+        for n in (1, 10):
+            # A fresh project each time, so both sizes start without rollup rows.
+            task = Task.objects.create(project=self.make_project(0, title=f'Project {n}'), title='Task')
+            users = [User.objects.create_user(f'user-{n}-{i}') for i in range(n)]
+            with self.assertNumQueries(13):
+                task.assigned_to.add(*users)
+            with self.assertNumQueries(12):
+                task.assigned_to.remove(*users)
+            self.assertEqual(Notification.objects.filter(task=task).count(), 2 * n)
+            unread = Profile.objects.filter(user__in=users).values_list('unread_notifications', flat=True)
+            self.assertEqual(set(unread), {2})
+
+
+# ---------------------------------------------------------
+# DASHBOARD AND ANALYTICS
+# ---------------------------------------------------------
+
+class DashboardAnalyticsTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_project(3)
+        ProjectAccess.load(self.owner)
+
+    def add_rows(self, n):
+        for i in range(n):
+            task = Task.objects.create(project=self.project, title=f'Extra {i}', status='Done')
+            Expense.objects.create(
+                project=self.project, description=f'Expense {i}', amount=5, category=f'Category {i % 3}',
+            )
+            ActivityLog.objects.create(project=self.project, user=self.owner, task=task, event_type=ActivityType.OTHER)
+
+    def test_warm_dashboard_hit_skips_the_database(self):
+        with self.assertNumQueries(4):
+            cold = self.client.get('/api/dashboard-stats/')
+        with self.assertNumQueries(0):
+            warm = self.client.get('/api/dashboard-stats/')
+        self.assertEqual(cold.data, warm.data)
+
+    def test_analytics_cost_and_shape_do_not_grow_with_the_account(self):
+        shapes = []
+        for n in (1, 30):
+            self.add_rows(n)
+            with self.assertNumQueries(4):
+                data = self.client.get('/api/analytics/').data
+            shapes.append((len(data['activity_by_day']), len(data['expenses_by_category'])))
+        self.assertEqual(shapes, [(7, 1), (7, 3)])
+        self.assertEqual(data['tasks'], {'done': 32, 'pending': 2})
+
+    def test_analytics_benchmark_runs_and_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_analytics', projects=2, rows=5, requests=2, stdout=out)
+        self.assertIn('dashboard warm:', out.getvalue())
+        self.assertFalse(User.objects.filter(username='benchmark-analytics').exists())
+
+    def test_analytics_benchmark_spreads_logs_over_the_week(self):
+        user = BenchmarkAnalyticsCommand().populate(1, 14)
+        days = {timezone.localdate(ts) for ts in ActivityLog.objects.filter(user=user).values_list('timestamp', flat=True)}
+        self.assertEqual(len(days), 7)
+        self.assertEqual(
+            set(ActivityRollup.objects.filter(user=user).values_list('day', flat=True)), days,
+        )
+
+    def rollup_total(self, user):
+        rows = ActivityRollup.objects.filter(project=self.project, user=user, action_type=ActivityType.OTHER)
+        return list(rows.values_list('count', flat=True))
+
+    def test_rollup_adds_to_a_row_inserted_concurrently(self):
+        log = ActivityLog(project=self.project, user=self.owner, event_type=ActivityType.OTHER, timestamp=timezone.now())
+        ActivityRollup.record([log])
+        real_update = QuerySet.update
+        calls = []
+
+        def update(queryset, **kwargs):
+            # The first UPDATE misses, as if another writer inserted the row just after it.
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=update):
+            ActivityRollup.record([log])
+        self.assertEqual(self.rollup_total(self.owner), [2])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ActivityRollup.objects.create(
+                project=self.project, user=self.owner, day=timezone.localdate(log.timestamp),
+                action_type=ActivityType.OTHER,
+            )
+
+    def test_rollup_without_a_user_adds_to_one_row(self):
+        day = timezone.localdate()
+        for _ in range(2):
+            ActivityRollup.objects.create(project=self.project, user=None, day=day, action_type=ActivityType.OTHER, count=1)
+        log = ActivityLog(project=self.project, user=None, event_type=ActivityType.OTHER, timestamp=timezone.now())
+        ActivityRollup.record([log])
+        self.assertEqual(sorted(self.rollup_total(None)), [1, 2])
+
+
+# ---------------------------------------------------------
+# SEARCH
+# ---------------------------------------------------------
+
+class SearchTests(APITestBase):
+    def test_title_matches_rank_above_comment_matches(self):
+        project = self.make_project(1)
+        titled = Task.objects.create(project=project, title='Repaint the gazebo before the summer party')
+        # Newer and shorter, so only the title weight can put it second.
+        comment = Comment.objects.create(task=project.tasks.get(title='Task 0'), author=self.owner, content='gazebo')
+
+        results = self.client.get('/api/search/', {'q': 'gazebo'}).data
+        self.assertEqual([(row['type'], row['id']) for row in results], [('task', titled.id), ('comment', comment.id)])
+
+    def test_results_are_limited_to_accessible_projects(self):
+        outsider = User.objects.create_user('outsider', 'outsider@example.com', 'pw')
+        visible = self.make_project(0, title='Gazebo visible')
+        hidden = Project.objects.create(owner=outsider, title='Gazebo hidden')
+        Task.objects.create(project=hidden, title='Gazebo task')
+
+        results = self.client.get('/api/search/', {'q': 'gaze'}).data
+        self.assertEqual({row['project'] for row in results}, {visible.id})
+        self.assertEqual(self.client.get('/api/search/', {'q': 'hidden'}).data, [])
+
+    def test_search_benchmark_runs_and_rolls_back(self):
+        documents = SearchDocument.objects.count()
+        out = StringIO()
+        call_command('benchmark_search', documents=300, projects=3, requests=2, stdout=out)
+        self.assertIn('rare word    scan: median', out.getvalue())
+        self.assertFalse(User.objects.filter(username='benchmark-search').exists())
+        self.assertEqual(SearchDocument.objects.count(), documents)
+
+
+# ---------------------------------------------------------
+# ACTIVITY EVENTS
+# ---------------------------------------------------------
+
+class ActivityEventTests(APITestBase):
+    def test_events_are_stored_typed_and_render_the_old_text(self):
+        project = self.make_project(0)
+        task = Task.objects.create(project=project, title='Write report')
+        task.assigned_to.add(self.member)
+        task.assigned_to.remove(self.member)
+        task.status = 'Done'
+        task.save()
+        Expense.objects.create(project=project, description='Paper', amount=5)
+        self.assertEqual(self.client.delete(f'/api/tasks/{task.id}/').status_code, 204)
+
+        self.assertFalse(ActivityLog.objects.exclude(action='').exists())
+        actions = {log['action'] for log in self.client.get('/api/activity-logs/').data['results']}
+        self.assertEqual(actions, {
+            'added owner to the team',
+            'added member to the team',
+            "added task 'Write report'",
+            "assigned member to task 'Write report'",
+            "unassigned member from task 'Write report'",
+            "completed task 'Write report'",
+            'added an expense: $5 (Paper)',
+            "deleted task 'Write report'",
+        })
+
+    def test_legacy_text_and_removed_targets(self):
+        project = self.make_project(0)
+        legacy = ActivityLog.objects.create(project=project, user=self.owner, action='renamed the project')
+        self.assertEqual(render_activity(legacy), 'renamed the project')
+        self.member.delete()
+        log = ActivityLog.objects.get(event_type=ActivityType.MEMBER_ADDED, target_user__isnull=True)
+        self.assertEqual(render_activity(log), 'added a removed user to the team')
+
+    def test_outcome_is_logged_once_per_task(self):
+        task = self.make_project(1).tasks.get()
+        for status in ('Done', 'Pending', 'Done'):
+            task.status = status
+            task.save()
+        events = ActivityFeed.objects.filter(task=task, event_type=ActivityType.TASK_COMPLETED)
+        self.assertEqual(events.count(), 1)
+
+        duplicate = ActivityLog(
+            project=task.project, user=self.owner, task=task, event_type=ActivityType.TASK_COMPLETED,
+        )
+        self.assertIsNone(ActivityLog.record_outcome(duplicate))
+        self.assertEqual(events.count(), 1)
+
+    def test_migration_parses_the_old_action_texts(self):
+        migration = importlib.import_module('api.migrations.0025_activity_event_type')
+        cases = {
+            "added task 'It's done'": ('task_created', None, "It's done"),
+            "assigned member to task 'Report'": ('task_assigned', 'member', 'Report'),
+            "missed due date for task 'Report'": ('task_missed', None, 'Report'),
+            'added an expense: $5 (Paper)': ('expense_added', None, '$5 (Paper)'),
+            'added member to the team': ('member_added', 'member', ''),
+            'renamed the project': None,
+        }
+        for action, parsed in cases.items():
+            self.assertEqual(migration.parse_action(action), parsed, action)
+
+
+# ---------------------------------------------------------
+# ACTIVITY ARCHIVE
+# ---------------------------------------------------------
+
+class ActivityArchiveTests(APITestBase):
+    def archive_all(self):
+        ActivityLog.objects.update(timestamp=timezone.now() - timedelta(days=400))
+        call_command('archive_activity', stdout=StringIO())
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_reconcile_keeps_last_activity_of_archived_logs(self):
+        project = self.make_project(2)
+        self.archive_all()
+        ProjectStats.objects.filter(project=project).update(
+            last_activity_at=ArchivedActivityLog.objects.aggregate(latest=Max('timestamp'))['latest'],
+        )
+
+        out = StringIO()
+        call_command('reconcile_project_stats', stdout=out)
+        self.assertIn('0 with drift', out.getvalue())
+        self.assertIsNotNone(ProjectStats.objects.get(project=project).last_activity_at)
+
+    def test_archived_outcome_is_not_logged_again(self):
+        project = self.make_project(2)
+        done = project.tasks.get(status='Pending')
+        done.status = 'Done'
+        done.save()
+        self.archive_all()
+
+        done.save()
+        self.client.post('/api/tasks/bulk/', {'update': [{'id': done.id, 'status': 'Done'}]}, format='json')
+        events = ActivityFeed.objects.filter(task=done, event_type=ActivityType.TASK_COMPLETED)
+        self.assertEqual(events.count(), 1)
+
+
+# ---------------------------------------------------------
+# PROJECT ACCESS
+# ---------------------------------------------------------
+
+class ProjectAccessTests(APITestBase):
+    def test_index_holds_owned_and_member_projects_only(self):
+        outsider = User.objects.create_user('outsider', 'outsider@example.com', 'pw')
+        owned = self.make_project(0)
+        joined = self.make_project(0, owner=outsider)
+        TeamMember.objects.filter(project=joined, user=outsider).delete()
+        TeamMember.objects.create(project=joined, user=self.owner)
+        hidden = Project.objects.create(owner=outsider, title='Hidden')
+
+        access = ProjectAccess.load_from_db(self.owner)
+        self.assertEqual(access.owned, {owned.id})
+        self.assertEqual(access.accessible, {owned.id, joined.id})
+        self.assertFalse(access.can_access(hidden.id))
+
+    def test_cache_miss_falls_back_to_sql(self):
+        project = self.make_project(0)
+        cache.clear()
+        with self.assertNumQueries(2):
+            access = ProjectAccess.load(self.owner)
+        self.assertTrue(access.owns(project.id))
+        with self.assertNumQueries(1):
+            ProjectAccess.load(self.owner)
+
+    def test_entry_left_in_another_workers_cache_is_not_used(self):
+        project = self.make_project(0)
+        ProjectAccess.load(self.member)
+        stale = cache.get(PROJECT_ACCESS_KEY.format(self.member.id))
+        TeamMember.objects.filter(project=project, user=self.member).get().delete()
+        # The delete only reached this worker's cache; another still holds the entry.
+        cache.set(PROJECT_ACCESS_KEY.format(self.member.id), stale)
+        self.assertFalse(ProjectAccess.load(self.member).can_access(project.id))
+
+    def test_stale_profile_save_does_not_roll_the_version_back(self):
+        profile = Profile.objects.get(user=self.member)
+        self.make_project(0)
+        profile.bio = 'Updated'
+        profile.save()
+        self.assertEqual(Profile.objects.get(user=self.member).access_version, 1)
+
+
+# ---------------------------------------------------------
+# QUERY PLANS
+# ---------------------------------------------------------
+
+class QueryPlanTests(APITestBase):
+    """Checks the scoped task and activity queries are answered from an index."""
+
+    def assert_uses_index(self, queryset, *index_names):
+        if connection.vendor == 'postgresql':
+            # The test tables are tiny, so make a sequential scan look costly.
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = queryset.explain()
+        for name in index_names:
+            self.assertIn(name, plan)
+
+    def index_on(self, model, column):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, model._meta.db_table)
+        return next(
+            name for name, info in constraints.items()
+            if info['index'] and not info['primary_key'] and info['columns'] == [column]
+        )
+
+    def test_access_index_reads_owner_and_member_indexes(self):
+        rows = Project.objects.filter(owner=self.owner).values_list('id').union(
+            TeamMember.objects.filter(user=self.owner).values_list('project_id')
+        )
+        self.assert_uses_index(rows, self.index_on(Project, 'owner_id'), self.index_on(TeamMember, 'user_id'))
+
+    def test_accessible_tasks_use_the_project_index(self):
+        self.make_project(2)
+        tasks = ProjectAccess.load(self.owner).filter(Task.objects.all())
+        self.assert_uses_index(tasks, self.index_on(Task, 'project_id'))
+
+    def test_overdue_sweep_uses_the_status_due_index(self):
+        overdue = Task.objects.filter(status__in=OPEN_STATUSES, due_date__lt=timezone.now().date())
+        self.assert_uses_index(overdue, 'task_status_due_idx')
+
+    def test_activity_feed_page_uses_both_timestamp_indexes(self):
+        project = self.make_project(2)
+        page = ActivityFeed.objects.filter(project=project).order_by('-timestamp', '-id')[:20]
+        self.assert_uses_index(page, 'activity_project_ts_idx', 'activity_archive_ts_idx')
+
+
+# ---------------------------------------------------------
+# ATTACHMENT UPLOADS
+# ---------------------------------------------------------
+
+class ZeroStream:
+    """A request body of ``size`` zero bytes that is never held in memory."""
+
+    def __init__(self, size):
+        self.remaining = size
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        self.remaining -= size
+        return bytes(size)
+
+    # There are no newlines, so a line runs to the size asked for.
+    readline = read
+
+
+class AttachmentTestBase(APITestBase):
+    """Stores files under a throwaway MEDIA_ROOT and streams them from Django."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, SENDFILE_BACKEND='')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.task = self.make_project(1).tasks.get()
+
+    def attach(self, content, name='notes.txt'):
+        response = self.client.post(
+            '/api/attachments/', {'task': self.task.id, 'file': SimpleUploadedFile(name, content)},
+            format='multipart',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        return Attachment.objects.get(pk=response.data['id'])
+
+
+class AttachmentBlobTests(AttachmentTestBase):
+    def test_signed_urls_are_stable_within_a_window(self):
+        attachment = self.attach(b'hello')
+        ttl = settings.ATTACHMENT_URL_TTL
+        start = signing_window() * ttl
+        with mock.patch('api.downloads.time.time', return_value=start):
+            url = attachment_download_url(attachment)
+        with mock.patch('api.downloads.time.time', return_value=start + ttl - 1):
+            self.assertEqual(attachment_download_url(attachment), url)
+        with mock.patch('api.downloads.time.time', return_value=start + ttl):
+            self.assertNotEqual(attachment_download_url(attachment), url)
+        # Even when signed at the very end of its window, a URL has a full TTL left.
+        with mock.patch('api.downloads.time.time', return_value=start + 2 * ttl):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_gc_keeps_an_old_orphan_that_is_uploaded_again(self):
+        first = self.attach(b'same bytes')
+        blob = first.blob
+        first.delete()
+        AttachmentBlob.objects.filter(pk=blob.pk).update(created_at=timezone.now() - timedelta(days=2))
+
+        second = self.attach(b'same bytes', name='copy.txt')
+        self.assertEqual(second.blob_id, blob.pk)
+        call_command('gc_attachments', stdout=StringIO())
+        self.assertTrue(AttachmentBlob.objects.filter(pk=blob.pk, ref_count=1).exists())
+        self.assertEqual(self.client.get(attachment_download_url(second)).status_code, 200)
+
+
+class SignedDownloadTests(AttachmentTestBase):
+    CONTENT = b'0123456789' * 10
+
+    def setUp(self):
+        super().setUp()
+        self.attachment = self.attach(self.CONTENT)
+        self.url = attachment_download_url(self.attachment)
+
+    def test_serves_a_valid_signature(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        response.close()
+
+    def test_rejects_an_expired_signature(self):
+        with mock.patch('api.downloads.time.time', return_value=time.time() + 2 * settings.ATTACHMENT_URL_TTL + 1):
+            self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_rejects_a_forged_signature(self):
+        forged_expiry = re.sub(r'exp=\d+', f'exp={int(time.time()) + 86400}', self.url)
+        other_file = self.url.replace('notes.txt', 'other.txt')
+        bad_signature = re.sub(r'sig=\w+', 'sig=' + '0' * 64, self.url)
+        for url in (forged_expiry, other_file, bad_signature):
+            self.assertEqual(self.client.get(url).status_code, 403, url)
+
+    def test_serves_byte_ranges(self):
+        cases = [
+            ('bytes=10-19', 206, b'0123456789', 'bytes 10-19/100'),
+            ('bytes=95-', 206, b'56789', 'bytes 95-99/100'),
+            ('bytes=-3', 206, b'789', 'bytes 97-99/100'),
+            ('bytes=90-500', 206, b'0123456789', 'bytes 90-99/100'),
+        ]
+        for header, status_code, body, content_range in cases:
+            response = self.client.get(self.url, HTTP_RANGE=header)
+            self.assertEqual(response.status_code, status_code, header)
+            self.assertEqual(response['Content-Range'], content_range)
+            self.assertEqual(b''.join(response.streaming_content), body)
+            response.close()
+
+        response = self.client.get(self.url, HTTP_RANGE='bytes=200-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_stale_if_range_gets_the_whole_file(self):
+        response = self.client.get(self.url, HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.CONTENT)
+        response.close()
+
+    def test_task_list_etag_rolls_over_with_the_signing_window(self):
+        params = {'project': self.task.project_id, 'expand': 'attachments'}
+        start = signing_window() * settings.ATTACHMENT_URL_TTL
+        with mock.patch('api.downloads.time.time', return_value=start):
+            response = self.client.get('/api/tasks/', params)
+            etag = response['ETag']
+            url = response.data[0]['attachments'][0]['file_url']
+        with mock.patch('api.downloads.time.time', return_value=start + settings.ATTACHMENT_URL_TTL - 1):
+            self.assertEqual(self.client.get('/api/tasks/', params, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with mock.patch('api.downloads.time.time', return_value=start + settings.ATTACHMENT_URL_TTL):
+            response = self.client.get('/api/tasks/', params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotEqual(response.data[0]['attachments'][0]['file_url'], url)
+
+
+class AttachmentStreamingTests(AttachmentTestBase):
+    CHUNKS = 4
+    # Well under a single chunk, so buffering any chunk or the file fails.
+    MEMORY_LIMIT = 4 * 1024 * 1024
+
+    def assert_memory_bounded(self, work):
+        tracemalloc.start()
+        try:
+            result = work()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, self.MEMORY_LIMIT)
+        return result
+
+    def upload(self, size):
+        response = self.client.post(
+            '/api/attachments/uploads/', {'task': self.task.id, 'filename': 'large.bin', 'size': size}, format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.data)
+        url = f"/api/attachments/uploads/{response.data['id']}/"
+        chunk_size = UploadSessionView.MAX_CHUNK_SIZE
+        for offset in range(0, size, chunk_size):
+            length = min(chunk_size, size - offset)
+            response = self.client.generic(
+                'PUT', url, HTTP_UPLOAD_OFFSET=str(offset),
+                CONTENT_LENGTH=str(length), **{'wsgi.input': ZeroStream(length)},
+            )
+            self.assertEqual(response.data, {'received': offset + length})
+        response = self.client.post(f'{url}finalize/')
+        self.assertEqual(response.status_code, 201, response.data)
+        return Attachment.objects.get(pk=response.data['id'])
+
+    def download(self, attachment):
+        response = self.client.get(attachment_download_url(attachment))
+        received = sum(len(chunk) for chunk in response.streaming_content)
+        response.close()
+        return received
+
+    def test_large_upload_and_download_stream_in_bounded_memory(self):
+        size = self.CHUNKS * UploadSessionView.MAX_CHUNK_SIZE
+        attachment = self.assert_memory_bounded(lambda: self.upload(size))
+        self.assertEqual(attachment.blob.size, size)
+        self.assertEqual(self.assert_memory_bounded(lambda: self.download(attachment)), size)
+
+
+class ThumbnailTests(AttachmentTestBase):
+    def setUp(self):
+        super().setUp()
+        # Render on the test thread, which can see the uncommitted rows.
+        patcher = mock.patch(
+            'api.models.schedule_thumbnails',
+            side_effect=lambda func, *args: transaction.on_commit(lambda: func(*args)),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def image(self, size=(400, 200), orientation=None):
+        exif = Image.Exif()
+        if orientation:
+            exif[ExifTags.Base.Orientation] = orientation
+        buffer = BytesIO()
+        Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+        return buffer.getvalue()
+
+    def open_variant(self, name):
+        with default_storage.open(name, 'rb') as fh, Image.open(fh) as image:
+            image.load()
+            return image
+
+    def test_image_attachments_get_signed_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            attachment = self.attach(self.image(), name='photo.jpg')
+        variants = AttachmentBlob.objects.get(pk=attachment.blob_id).variants
+        sizes = {label: self.open_variant(name).size for label, name in variants.items()}
+        self.assertEqual(sizes, {'sm': (64, 32), 'md': (256, 128), 'lg': (400, 200)})
+        self.assertEqual(self.open_variant(variants['sm']).format, 'WEBP')
+
+        urls = self.client.get('/api/attachments/', {'task': self.task.id}).data[0]['thumbnail_urls']
+        self.assertEqual(set(urls), {'sm', 'md', 'lg'})
+        response = self.client.get(urls['sm'])
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            text = self.attach(b'not an image')
+        self.assertIsNone(text.blob.variants)
+
+    def test_orientation_is_applied_and_metadata_dropped(self):
+        name = default_storage.save('rotated.jpg', ContentFile(self.image(orientation=6)))
+        variant = self.open_variant(render_variants(name)['md'])
+        self.assertEqual(variant.size, (128, 256))
+        self.assertFalse(variant.getexif())
+
+    def test_skips_oversized_and_unreadable_files(self):
+        name = default_storage.save('large.jpg', ContentFile(self.image()))
+        broken = default_storage.save('broken.jpg', ContentFile(b'not an image'))
+        with self.assertLogs('api.thumbnails', 'WARNING') as logs:
+            with override_settings(THUMBNAIL_MAX_PIXELS=1000):
+                self.assertEqual(render_variants(name), {})
+            self.assertEqual(render_variants(broken), {})
+        self.assertEqual(len(logs.output), 2)
+        self.assertEqual(sorted(default_storage.listdir('')[1]), ['broken.jpg', 'large.jpg'])
+
+    def test_profile_picture_falls_back_until_rendered(self):
+        profile = Profile.objects.get(user=self.owner)
+        profile.profile_picture = SimpleUploadedFile('me.jpg', self.image())
+        with self.captureOnCommitCallbacks(execute=True):
+            profile.save()
+        profile.refresh_from_db()
+        self.assertEqual(set(profile.picture_variants), {'sm', 'md'})
+        self.assertTrue(ProfileSerializer(profile).data['profile_picture'].endswith('.md.webp'))
+
+        with mock.patch('api.models.schedule_thumbnails'):
+            profile.profile_picture = SimpleUploadedFile('new.jpg', self.image())
+            profile.save()
+        profile.refresh_from_db()
+        self.assertIsNone(profile.picture_variants)
+        self.assertEqual(ProfileSerializer(profile).data['profile_picture'], profile.profile_picture.url)
+
+
+# ---------------------------------------------------------
+# OVERDUE SWEEP
+# ---------------------------------------------------------
+
+class MarkMissedTasksTests(APITestBase):
+    def test_sweep_marks_and_logs_overdue_tasks(self):
+        project = self.make_project(0)
+        yesterday = timezone.now().date() - timedelta(days=1)
+        overdue = [Task.objects.create(project=project, title=f'Late {i}', due_date=yesterday) for i in range(5)]
+        Task.objects.create(project=project, title='Finished', status='Done', due_date=yesterday)
+        Task.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+
+        started = timezone.now()
+        call_command('mark_missed_tasks', batch_size=2, stdout=StringIO())
+        self.assertEqual(set(Task.objects.filter(status='Missed')), set(overdue))
+        self.assertEqual(set(Task.objects.filter(updated_at__gte=started)), set(overdue))
+        events = ActivityFeed.objects.filter(project=project, event_type=ActivityType.TASK_MISSED)
+        self.assertEqual(set(events.values_list('task_id', flat=True)), {task.id for task in overdue})
+        self.assertEqual(ProjectStats.objects.get(project=project).missed_tasks, 5)
+
+        call_command('mark_missed_tasks', stdout=StringIO())
+        self.assertEqual(events.count(), 5)
+
+    def test_task_list_benchmark_runs_and_rolls_back(self):
+        out = StringIO()
+        call_command('benchmark_task_list', tasks=200, projects=4, requests=2, stdout=out)
+        self.assertIn('no sweep: median', out.getvalue())
+        self.assertFalse(User.objects.filter(username='benchmark-task-list').exists())
+
+
+# ---------------------------------------------------------
+# NOTIFICATION PRUNING
+# ---------------------------------------------------------
+
+class PruneNotificationsTests(APITestBase):
+    def test_collapses_repeats_one_inbox_per_transaction(self):
+        task = self.make_project(1).tasks.get()
+        for _ in range(3):
+            Notification.objects.create(user=self.member, task=task, message='Reminder')
+        Notification.objects.create(user=self.member, task=task, message='Other')
+        for _ in range(2):
+            Notification.objects.create(user=self.owner, task=task, message='Reminder', is_read=True)
+        Notification.objects.create(user=User.objects.create_user('quiet'), message='Only one')
+
+        with mock.patch.object(
+            PruneNotificationsCommand, 'collapse_inbox', autospec=True,
+            side_effect=PruneNotificationsCommand.collapse_inbox,
+        ) as collapse_inbox:
+            call_command('prune_notifications', no_archive=True, stdout=StringIO())
+        self.assertEqual(
+            sorted(call.args[1] for call in collapse_inbox.call_args_list), [self.owner.id, self.member.id],
+        )
+
+        reminder = Notification.objects.get(user=self.member, message='Reminder')
+        self.assertEqual((reminder.count, reminder.is_read), (3, False))
+        self.assertEqual(Profile.objects.get(user=self.member).unread_notifications, 2)
+        survivor = Notification.objects.get(user=self.owner)
+        self.assertEqual((survivor.count, survivor.is_read), (2, True))
+        self.assertEqual(Notification.objects.count(), 4)
+
+
+# ---------------------------------------------------------
+# USER SEARCH
+# ---------------------------------------------------------
+
+class UserSearchTests(APITestBase):
+    def search(self, **params):
+        response = self.client.get('/api/users/search/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [user['username'] for user in response.data]
+
+    def test_prefix_matches_username_or_email_case_insensitively(self):
+        User.objects.create_user('alice', 'zed@example.com')
+        User.objects.create_user('bob', 'Alpha@example.com')
+        User.objects.create_user('malice', 'malice@example.com')
+        self.assertEqual(self.search(q='AL'), ['alice', 'bob'])
+        self.assertEqual(self.search(q=' '), [])
+
+    def test_limit_is_capped(self):
+        for i in range(30):
+            User.objects.create_user(f'student{i:02}')
+        self.assertEqual(len(self.search(q='student')), 10)
+        self.assertEqual(self.search(q='student', limit=2), ['student00', 'student01'])
+        self.assertEqual(len(self.search(q='student', limit=100)), 25)
+
+    def test_profiles_do_not_cost_a_query_per_user(self):
+        for n in (1, 10):
+            User.objects.filter(username__startswith='typeahead').delete()
+            for i in range(n):
+                User.objects.create_user(f'typeahead{i}')
+            with self.assertNumQueries(1):
+                self.assertEqual(len(self.search(q='typeahead')), n)
+
+    def test_exclude_project_drops_the_team(self):
+        project = self.make_project(0)
+        User.objects.create_user('outsider')
+        self.assertEqual(self.search(q='o'), ['outsider', 'owner'])
+        self.assertEqual(self.search(q='', exclude_project=project.id), [])
+        self.assertEqual(self.search(q='o', exclude_project=project.id), ['outsider'])
+        self.assertEqual(self.search(q='m', exclude_project=project.id), [])
+
+    def test_exclude_project_requires_access(self):
+        stranger = User.objects.create_user('stranger')
+        private = self.make_project(0, owner=stranger, project_type='Personal')
+        TeamMember.objects.filter(project=private, user=self.member).delete()
+        response = self.client.get('/api/users/search/', {'q': 'm', 'exclude_project': private.id})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/api/users/search/', {'q': 'm', 'exclude_project': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------------------------------------------------------
+# CONDITIONAL LISTS
+# ---------------------------------------------------------
+
+class ConditionalListTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_project(2)
+        ProjectAccess.load(self.owner)
+
+    def revalidate(self, path, etag, params=None):
+        return self.client.get(path, params, HTTP_IF_NONE_MATCH=etag)
+
+    def test_matching_etag_skips_the_list_query(self):
+        for path in ('/api/projects/', '/api/tasks/', '/api/team-members/'):
+            response = self.client.get(path)
+            self.assertEqual(response['Cache-Control'], 'private, no-cache')
+            # The access version check and the ProjectStats versions.
+            with self.assertNumQueries(2):
+                response = self.revalidate(path, response['ETag'])
+            self.assertEqual(response.status_code, 304, path)
+            self.assertFalse(response.content)
+
+    def test_task_write_changes_the_etag(self):
+        etag = self.client.get('/api/tasks/')['ETag']
+        task = self.project.tasks.first()
+        response = self.client.patch(f'/api/tasks/{task.id}/', {'status': 'Done'}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        response = self.revalidate('/api/tasks/', etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.revalidate('/api/tasks/', response['ETag']).status_code, 304)
+
+    def test_assignment_and_membership_change_the_etag(self):
+        task_etag = self.client.get('/api/tasks/')['ETag']
+        member_etag = self.client.get('/api/team-members/')['ETag']
+        self.project.tasks.first().assigned_to.add(self.member)
+        self.assertEqual(self.revalidate('/api/tasks/', task_etag).status_code, 200)
+
+        TeamMember.objects.create(project=self.project, user=User.objects.create_user('newcomer'))
+        self.assertEqual(self.revalidate('/api/team-members/', member_etag).status_code, 200)
+
+    def test_etag_depends_on_the_query_and_the_user(self):
+        etag = self.client.get('/api/tasks/')['ETag']
+        self.assertEqual(self.revalidate('/api/tasks/', etag, {'project': self.project.id}).status_code, 200)
+        self.client.force_authenticate(self.member)
+        self.assertEqual(self.revalidate('/api/tasks/', etag).status_code, 200)
+
+
+# ---------------------------------------------------------
+# SPARSE FIELDSETS
+# ---------------------------------------------------------
+
+class SparseFieldsetTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.project = self.make_project(1)
+        self.task = self.project.tasks.get()
+        self.task.assigned_to.add(self.member)
+
+    def test_task_fields_limit_the_payload_and_the_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/', {'fields': 'title'})
+        self.assertEqual(response.data, [{'id': self.task.id, 'title': 'Task 0'}])
+        task_query = next(q['sql'] for q in queries if 'FROM "api_task"' in q['sql'])
+        self.assertNotIn('"description"', task_query)
+        self.assertNotIn('assigned_to', ' '.join(q['sql'] for q in queries))
+
+    def test_nested_task_fields_are_opt_in(self):
+        task = self.client.get('/api/tasks/').data[0]
+        self.assertEqual(task['assigned_to'], [self.member.id])
+        self.assertNotIn('assigned_to_details', task)
+        self.assertNotIn('attachments', task)
+
+        task = self.client.get('/api/tasks/', {'expand': 'assigned_to_details,attachments'}).data[0]
+        self.assertEqual([user['username'] for user in task['assigned_to_details']], ['member'])
+        self.assertEqual(task['attachments'], [])
+
+    def test_project_members_are_opt_in(self):
+        project = self.client.get('/api/projects/', {'fields': 'title,progress'}).data[0]
+        self.assertEqual(set(project), {'id', 'title', 'progress'})
+        project = self.client.get('/api/projects/', {'expand': 'team_members'}).data[0]
+        self.assertEqual(
+            sorted(member['user']['username'] for member in project['team_members']), ['member', 'owner'],
+        )
+
+    def test_fields_are_ignored_on_writes(self):
+        response = self.client.patch(
+            f'/api/tasks/{self.task.id}/?fields=id', {'title': 'Renamed'}, format='json',
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['title'], 'Renamed')
+        self.assertIn('status', response.data)
+
+
+# ---------------------------------------------------------
+# COMMENT THREADS
+# ---------------------------------------------------------
+
+class CommentThreadTests(APITestBase):
+    def setUp(self):
+        super().setUp()
+        self.task, self.other_task = self.make_project(2).tasks.order_by('id')
+        ProjectAccess.load(self.owner)
+
+    def comment(self, task, n, author=None):
+        for i in range(n):
+            Comment.objects.create(task=task, author=author or self.owner, content=f'Comment {i}')
+
+    def test_lists_only_accessible_comments(self):
+        stranger = User.objects.create_user('stranger')
+        hidden = self.make_project(1, owner=stranger, project_type='Personal', title='Private').tasks.get()
+        self.comment(hidden, 1, author=stranger)
+        self.comment(self.task, 1)
+        self.comment(self.other_task, 1)
+        self.assertEqual(len(self.client.get('/api/comments/').data['results']), 2)
+        results = self.client.get('/api/comments/', {'task': self.task.id}).data['results']
+        self.assertEqual([comment['task'] for comment in results], [self.task.id])
+        self.assertEqual(self.client.get('/api/comments/', {'task': 'x'}).status_code, 400)
+
+        response = self.client.post('/api/comments/', {'task': hidden.id, 'content': 'Hi'}, format='json')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post('/api/comments/', {'task': self.task.id, 'content': 'Hi'}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['author_username'], 'owner')
+
+    def test_pages_walk_the_thread_oldest_first(self):
+        self.comment(self.task, 5)
+        Comment.objects.update(created_at=timezone.now())
+        seen = []
+        url = f'/api/comments/?task={self.task.id}&page_size=2'
+        while url:
+            data = self.client.get(url).data
+            seen += [comment['content'] for comment in data['results']]
+            url = data['next']
+        self.assertEqual(seen, [f'Comment {i}' for i in range(5)])
+
+    def test_page_cost_does_not_grow_with_the_thread(self):
+        for n in (1, 20):
+            self.comment(self.task, n, author=User.objects.create_user(f'author-{n}'))
+            # The access version check and the page.
+            with self.assertNumQueries(2):
+                response = self.client.get('/api/comments/', {'task': self.task.id})
+            self.assertEqual(response.status_code, 200)
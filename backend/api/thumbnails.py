@@ -0,0 +1,107 @@
+import logging
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+# Longest edge, in pixels, of each derivative.
+THUMBNAIL_SIZES = {'sm': 64, 'md': 256, 'lg': 1024}
+
+FORMAT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Thumbnails are rendered on one background thread so uploads return at once.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='thumbnails')
+
+
+def variant_name(name, label):
+    """Storage name of the ``label`` derivative, next to the original."""
+    base, _ = os.path.splitext(name)
+    return f"{base}.{label}.{FORMAT_EXTENSIONS[settings.THUMBNAIL_FORMAT]}"
+
+
+def pick_variant(name, variants, label):
+    """The derivative for ``label`` when it has been rendered, else the original."""
+    return (variants or {}).get(label) or name
+
+
+def render_variants(name, sizes=THUMBNAIL_SIZES):
+    """
+    Writes resized, EXIF-free copies of the stored image ``name`` and returns
+    {label: storage name}. Returns {} for files that are not images or whose
+    pixel count is over THUMBNAIL_MAX_PIXELS, before decoding them.
+    """
+    image_format = settings.THUMBNAIL_FORMAT
+    variants = {}
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', Image.DecompressionBombWarning)
+            with default_storage.open(name, 'rb') as fh, Image.open(fh) as source:
+                if source.width * source.height > settings.THUMBNAIL_MAX_PIXELS:
+                    logger.warning("Skipping thumbnails for %s: %sx%s is too large.", name, source.width, source.height)
+                    return {}
+                # Lets JPEG decode at a reduced scale when that is enough.
+                source.draft('RGB', (max(sizes.values()),) * 2)
+                image = ImageOps.exif_transpose(source)
+                keep_alpha = image_format == 'WEBP' and image.mode in ('RGBA', 'LA', 'P')
+                image = image.convert('RGBA' if keep_alpha else 'RGB')
+
+                # Largest first, so each smaller size is resampled from the last.
+                for label, size in sorted(sizes.items(), key=lambda item: -item[1]):
+                    image.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=3.0)
+                    buffer = BytesIO()
+                    # No exif= argument, so metadata is not carried over.
+                    image.save(buffer, image_format, quality=80)
+                    target = variant_name(name, label)
+                    if default_storage.exists(target):
+                        default_storage.delete(target)
+                    variants[label] = default_storage.save(target, ContentFile(buffer.getvalue()))
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning, UnidentifiedImageError, OSError) as exc:
+        logger.warning("Could not render thumbnails for %s: %s", name, exc)
+        for target in variants.values():
+            default_storage.delete(target)
+        return {}
+    return variants
+
+
+def generate_profile_variants(profile_id):
+    from .models import Profile
+
+    profile = Profile.objects.filter(pk=profile_id).first()
+    if profile is None or not profile.profile_picture:
+        return
+    name = profile.profile_picture.name
+    variants = render_variants(name, {'sm': THUMBNAIL_SIZES['sm'], 'md': THUMBNAIL_SIZES['md']})
+    # Skip the write if the picture was replaced while rendering.
+    Profile.objects.filter(pk=profile_id, profile_picture=name).update(picture_variants=variants)
+
+
+def generate_blob_variants(sha256):
+    from .models import AttachmentBlob
+
+    blob = AttachmentBlob.objects.filter(pk=sha256).first()
+    if blob is None:
+        return
+    variants = render_variants(blob.file.name)
+    AttachmentBlob.objects.filter(pk=sha256).update(variants=variants)
+
+
+def _run(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception("Thumbnail generation failed for %s%r", func.__name__, args)
+    finally:
+        close_old_connections()
+
+
+def schedule(func, *args):
+    """Runs ``func(*args)`` on the thumbnail thread once the transaction commits."""
+    transaction.on_commit(lambda: _executor.submit(_run, func, *args))
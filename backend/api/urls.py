@@ -1,10 +1,12 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
-    CreateUserView, UserListView, GetUserView, UpdateUserView, GoogleAuth,
+    CreateUserView, UserListView, UserSearchView, GetUserView, UpdateUserView, GoogleAuth,
     ProjectViewSet, TaskViewSet, TeamMemberViewSet, ExpenseViewSet,
     CommentViewSet, NotificationViewSet, ActivityLogViewSet,
-    AttachmentListView, DashboardStatsView
+    AttachmentListView, AttachmentDownloadView, UploadSessionCreateView, UploadSessionView, UploadSessionFinalizeView,
+    DashboardStatsView, AnalyticsView, SearchView,
+    notification_stream
 )
 
 router = DefaultRouter()
@@ -22,11 +24,19 @@ urlpatterns = [
     
 
     path('users/', UserListView.as_view(), name='user-list'),
+    path('users/search/', UserSearchView.as_view(), name='user-search'),
     path('user/', GetUserView.as_view(), name='get-user'), 
     path('user/update/', UpdateUserView.as_view(), name='update-user'), 
 
     path('attachments/', AttachmentListView.as_view(), name='attachment-list-create'),
+    path('attachments/<int:pk>/download/', AttachmentDownloadView.as_view(), name='attachment-download'),
+    path('attachments/uploads/', UploadSessionCreateView.as_view(), name='upload-session-create'),
+    path('attachments/uploads/<uuid:pk>/', UploadSessionView.as_view(), name='upload-session'),
+    path('attachments/uploads/<uuid:pk>/finalize/', UploadSessionFinalizeView.as_view(), name='upload-session-finalize'),
 
     path('dashboard-stats/', DashboardStatsView.as_view(), name='dashboard-stats'),
+    path('analytics/', AnalyticsView.as_view(), name='analytics'),
+    path('search/', SearchView.as_view(), name='search'),
+    path('notifications/stream/', notification_stream, name='notification-stream'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,7 +1,21 @@
-from django.shortcuts import render
-from django.db import models
+import asyncio
+import hashlib
+import json
+import os
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import render, get_object_or_404
+from django.core.files import File
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import (
+    Http404, HttpResponseForbidden, HttpResponseNotAllowed, HttpResponseRedirect, JsonResponse, StreamingHttpResponse,
+)
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db.models import Q, Count, Sum, Prefetch, prefetch_related_objects
 from rest_framework import viewsets, generics, status, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -9,23 +23,37 @@ from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.parsers import MultiPartParser, FormParser
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
 from google.oauth2 import id_token
 from google.auth.transport import requests
 from .permissions import IsTeamMemberOrOwner, IsOwnerOrReadOnly
+from .access import get_project_access
+from .downloads import serve_file, signing_window, verify_signed_request
+from .search import search_documents
+from .caching import get_dashboard_cache_key, invalidate_dashboards, invalidate_project_dashboards, DASHBOARD_SNAPSHOT_TIMEOUT
+from .events import notification_broker
+from .pagination import ActivityLogCursorPagination, CommentCursorPagination, NotificationCursorPagination
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from django.utils import timezone
 from django.core.validators import validate_email
+from django.core.cache import cache
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.http import parse_etags
+from datetime import timedelta
 
 from .models import (
     Project, Task, TeamMember, Comment, Attachment, 
-    ActivityLog, Notification, Expense, Profile
+    ActivityLog, Notification, Expense, Profile, ProjectStats, UploadSession, AttachmentBlob,
+    SearchDocument, ActivityFeed, ActivityRollup, ActivityType,
+    delete_tasks, log_assignment_changes, log_task_status_changes,
 )
 
 from .serializers import (
     ProjectSerializer, TaskSerializer,
     TeamMemberSerializer, CommentSerializer, AttachmentSerializer,
     NotificationSerializer, ExpenseSerializer, ActivityLogSerializer,
-    CustomUserSerializer 
+    CustomUserSerializer, UploadSessionSerializer, attachment_download_url
 )
 
 # ---------------------------------------------------------
@@ -38,10 +66,51 @@ class CreateUserView(generics.CreateAPIView):
     permission_classes = [AllowAny]
 
 class UserListView(generics.ListAPIView):
-    queryset = User.objects.all()
+    queryset = User.objects.select_related('profile')
     serializer_class = CustomUserSerializer 
     permission_classes = [IsAuthenticated]
 
+class UserSearchView(generics.ListAPIView):
+    """
+    Typeahead lookup for member pickers: prefix match on username or email,
+    capped at ``limit`` results. ``exclude_project`` drops users who are
+    already on that project.
+    """
+    serializer_class = CustomUserSerializer
+    permission_classes = [IsAuthenticated]
+    DEFAULT_LIMIT = 10
+    MAX_LIMIT = 25
+
+    def get_queryset(self):
+        query = self.request.query_params.get('q', '').strip()
+        if not query:
+            return User.objects.none()
+
+        queryset = User.objects.filter(
+            Q(username__istartswith=query) | Q(email__istartswith=query)
+        ).select_related('profile')
+
+        project_id = self.request.query_params.get('exclude_project')
+        if project_id:
+            try:
+                project = Project.objects.get(id=project_id)
+            except (Project.DoesNotExist, ValueError):
+                raise ValidationError({"exclude_project": "Project not found."})
+            if not get_project_access(self.request).can_access(project.id):
+                raise PermissionDenied("You do not have access to this project.")
+            queryset = queryset.exclude(id=project.owner_id).exclude(
+                id__in=TeamMember.objects.filter(project=project).values('user_id')
+            )
+
+        return queryset.order_by('username')[:self._get_limit()]
+
+    def _get_limit(self):
+        try:
+            limit = int(self.request.query_params.get('limit', self.DEFAULT_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+        return max(1, min(limit, self.MAX_LIMIT))
+
 class GetUserView(generics.RetrieveAPIView):
     serializer_class = CustomUserSerializer 
     permission_classes = [IsAuthenticated]
@@ -112,21 +181,7 @@ class UpdateUserView(APIView):
 
         # ✅ CRITICAL FIX: Return data in the SAME format as CustomUserSerializer
         # This ensures consistency between GET and PUT responses
-        profile_pic_url = None
-        if profile.profile_picture:
-            profile_pic_url = request.build_absolute_uri(profile.profile_picture.url)
-
-        return Response({
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "profile": {
-                "role": profile.role,
-                "course": profile.course,
-                "bio": profile.bio,
-                "profile_picture": profile_pic_url
-            }
-        }, status=status.HTTP_200_OK)
+        return Response(CustomUserSerializer(user, context={'request': request}).data, status=status.HTTP_200_OK)
     
 class GoogleAuth(APIView):
     permission_classes = [AllowAny]
@@ -164,71 +219,165 @@ class GoogleAuth(APIView):
 # MAIN API VIEWSETS
 # ---------------------------------------------------------
 
-class ProjectViewSet(viewsets.ModelViewSet):
+def concrete_columns(model, fields):
+    """Names in ``fields`` that are concrete columns of ``model``, for only()."""
+    return [field.name for field in model._meta.concrete_fields if field.name in fields]
+
+class ConditionalListMixin:
+    """
+    Tags list responses with a weak ETag derived from the ProjectStats
+    version of every project in scope, and answers a matching If-None-Match
+    with 304 before anything is serialized.
+    """
+
+    def get_etag_project_ids(self):
+        raise NotImplementedError
+
+    def get_etag_window(self):
+        """
+        The signing window of any signed URLs in the response, or None. A
+        new window changes the tag, so clients never revalidate an expired URL.
+        """
+        return None
+
+    def list(self, request, *args, **kwargs):
+        etag = self._get_list_etag(request)
+        if_none_match = request.headers.get('If-None-Match', '')
+        if etag.removeprefix('W/') in {tag.removeprefix('W/') for tag in parse_etags(if_none_match)}:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def _get_list_etag(self, request):
+        project_ids = sorted(self.get_etag_project_ids())
+        versions = list(
+            ProjectStats.objects.filter(project_id__in=project_ids)
+            .order_by('project_id').values_list('project_id', 'version')
+        )
+        stamp = (
+            f"{request.user.id}|{request.get_full_path()}|{project_ids}|{versions}|{self.get_etag_window()}"
+        )
+        return f'W/"{hashlib.sha1(stamp.encode()).hexdigest()}"'
+
+class ProjectViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated, IsOwnerOrReadOnly] 
 
     def get_queryset(self):
-        user = self.request.user
-        queryset = Project.objects.filter(
-            Q(owner=user) | Q(team_members__user=user)
-        ).distinct()
+        queryset = get_project_access(self.request).filter(Project.objects.all(), field='id')
 
         project_type = self.request.query_params.get('type') 
         if project_type:
             queryset = queryset.filter(project_type=project_type) 
-            
+
+        return self._apply_fieldset(queryset)
+
+    def _apply_fieldset(self, queryset):
+        fields, expand = ProjectSerializer.requested_fields(self.request)
+        wanted = lambda name: fields is None or name in fields
+        columns = ['id', 'owner']
+
+        if wanted('progress') or wanted('task_counts'):
+            queryset = queryset.select_related('stats')
+            columns.append('stats')
+        if wanted('owner_username'):
+            queryset = queryset.select_related('owner')
+            columns.append('owner__username')
+        if 'team_members' in expand:
+            queryset = queryset.prefetch_related('team_members__user__profile')
+        if fields is not None:
+            queryset = queryset.only(*columns, *concrete_columns(Project, fields))
         return queryset
 
+    def get_etag_project_ids(self):
+        return get_project_access(self.request).accessible
+
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-class TaskViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    def activity(self, request, pk=None):
+        project = self.get_object()
+        logs = ActivityFeed.objects.filter(project=project).select_related('user', 'target_user', 'project', 'task')
+        paginator = ActivityLogCursorPagination()
+        page = paginator.paginate_queryset(logs, request, view=self)
+        serializer = ActivityLogSerializer(page, many=True, context=self.get_serializer_context())
+        return paginator.get_paginated_response(serializer.data)
+
+class TaskViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = TaskSerializer
     permission_classes = [IsTeamMemberOrOwner]
 
     def get_queryset(self):
-        Task.objects.filter(
-            due_date__lt=timezone.now().date(),
-            status__in=['To Do', 'In Progress', 'Pending'] 
-        ).exclude(
-            status__in=['Done', 'Missed']
-        ).update(status='Missed')
-
-        queryset = Task.objects.all()
+        # Overdue tasks are marked 'Missed' by the mark_missed_tasks command.
+        queryset = self._apply_fieldset(Task.objects.all())
+        project_id = self._get_requested_project_id()
+
+        if project_id:
+            return queryset.filter(project_id=project_id)
+        else:
+            return get_project_access(self.request).filter(queryset)
+
+    def _apply_fieldset(self, queryset):
+        fields, expand = TaskSerializer.requested_fields(self.request)
+        wanted = lambda name: fields is None or name in fields
+        # project_id drives the permission checks, so it is always loaded.
+        columns = ['id', 'project']
+
+        if wanted('project_owner_id'):
+            queryset = queryset.select_related('project')
+            columns.append('project__owner')
+        if 'assigned_to_details' in expand:
+            queryset = queryset.prefetch_related('assigned_to__profile')
+        elif wanted('assigned_to'):
+            queryset = queryset.prefetch_related(Prefetch('assigned_to', queryset=User.objects.only('id')))
+        if 'attachments' in expand:
+            queryset = queryset.prefetch_related('attachments__uploaded_by', 'attachments__blob')
+        if fields is not None:
+            queryset = queryset.only(*columns, *concrete_columns(Task, fields))
+        return queryset
+
+    def _get_requested_project_id(self):
         project_id = self.request.query_params.get('project')
+        if not project_id:
+            return None
+        try:
+            project_id = int(project_id)
+        except ValueError:
+            raise PermissionDenied("Project not found.")
+        if not get_project_access(self.request).can_access(project_id):
+            raise PermissionDenied("You do not have permission to view tasks for this project.")
+        return project_id
 
+    def get_etag_project_ids(self):
+        project_id = self._get_requested_project_id()
         if project_id:
-            try:
-                project = Project.objects.get(id=project_id)
-            except Project.DoesNotExist:
-                raise PermissionDenied("Project not found.")
+            return [project_id]
+        return get_project_access(self.request).accessible
 
-            if self.request.user == project.owner or project.team_members.filter(user=self.request.user).exists():
-                return queryset.filter(project=project).distinct()
-            else:
-                raise PermissionDenied("You do not have permission to view tasks for this project.")
-        else:
-            user_projects = Project.objects.filter(
-                models.Q(owner=self.request.user) |
-                models.Q(team_members__user=self.request.user)
-            ).distinct()
-            return queryset.filter(project__in=user_projects).distinct()
+    def get_etag_window(self):
+        _, expand = TaskSerializer.requested_fields(self.request)
+        return signing_window() if 'attachments' in expand else None
 
     def perform_create(self, serializer):
         project = serializer.validated_data['project']
-        if not project.team_members.filter(user=self.request.user).exists() and self.request.user != project.owner:
+        if not get_project_access(self.request).can_access(project.id):
              raise PermissionDenied("You must be the project owner or a member of the project to create tasks.")
         serializer.save()
 
     def _check_assignment_permission(self, request, task_instance):
         """Helper method to check if the user is allowed to change assignments."""
         if 'assigned_to' in request.data:
-            if request.user != task_instance.project.owner:
+            if not get_project_access(request).owns(task_instance.project_id):
                 request.data.pop('assigned_to')  
         return request
 
     def update(self, request, *args, **kwargs):
+        # Mirrors UpdateModelMixin.update, but looks the task up only once.
+        partial = kwargs.pop('partial', False)
         instance = self.get_object() 
         if hasattr(request.data, '_mutable'):
             request.data._mutable = True
@@ -237,52 +386,251 @@ class TaskViewSet(viewsets.ModelViewSet):
         
         if hasattr(request.data, '_mutable'):
             request.data._mutable = False
-        return super().update(request, *args, **kwargs)
 
-    def partial_update(self, request, *args, **kwargs):
-        instance = self.get_object() 
-        if hasattr(request.data, '_mutable'):
-            request.data._mutable = True
-        
-        request = self._check_assignment_permission(request, instance)
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
 
-        if hasattr(request.data, '_mutable'):
-            request.data._mutable = False     
-        return super().partial_update(request, *args, **kwargs)
+        if getattr(instance, '_prefetched_objects_cache', None):
+            instance._prefetched_objects_cache = {}
+        return Response(serializer.data)
+
+    def partial_update(self, request, *args, **kwargs):
+        kwargs['partial'] = True
+        return self.update(request, *args, **kwargs)
     
     def perform_destroy(self, instance):
-        if instance.project.owner:
+        if instance.project.owner_id:
             ActivityLog.objects.create(
                 project=instance.project,
                 user=self.request.user,
-                action=f"deleted task '{instance.title}'",
+                event_type=ActivityType.TASK_DELETED,
+                subject=instance.title,
                 task=instance
             )
         instance.delete()
 
+    # -----------------------
+    # BULK OPERATIONS
+    # -----------------------
+    MAX_BULK_OPERATIONS = 500
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """
+        Applies {"create": [...], "update": [{"id": ...}, ...], "delete": [ids]}
+        in one transaction. Tasks, assignments and deletes are written in
+        bulk, so the signal side effects are applied here in batches instead
+        and the query count does not grow with the number of items.
+        """
+        if not isinstance(request.data, dict):
+            raise ValidationError("Expected an object with create, update and delete lists.")
+        operations = {key: request.data.get(key) or [] for key in ('create', 'update', 'delete')}
+        for key, items in operations.items():
+            if not isinstance(items, list):
+                raise ValidationError({key: "Expected a list."})
+        if sum(len(items) for items in operations.values()) > self.MAX_BULK_OPERATIONS:
+            raise ValidationError(f"At most {self.MAX_BULK_OPERATIONS} operations per request.")
+
+        access = get_project_access(request)
+        with transaction.atomic():
+            created = self._bulk_create_tasks(operations['create'], access)
+            updated = self._bulk_update_tasks(operations['update'], access)
+            deleted = self._bulk_delete_tasks(operations['delete'], access)
+
+        tasks = self._apply_fieldset(Task.objects.all()).in_bulk(created + updated)
+        context = self.get_serializer_context()
+        return Response({
+            'created': TaskSerializer([tasks[pk] for pk in created if pk in tasks], many=True, context=context).data,
+            'updated': TaskSerializer([tasks[pk] for pk in updated if pk in tasks], many=True, context=context).data,
+            'deleted': deleted,
+        })
+
+    def _bulk_serializer_context(self, items):
+        """
+        Serializer context with every project and user the items refer to
+        fetched up front, so validating them costs no query per item.
+        """
+        def ids(values):
+            return {int(value) for value in values if not isinstance(value, bool) and str(value).isdecimal()}
+
+        items = [item for item in items if isinstance(item, dict)]
+        project_ids = ids(item.get('project') for item in items)
+        user_ids = ids(
+            user_id for item in items if isinstance(item.get('assigned_to'), list)
+            for user_id in item['assigned_to']
+        )
+        context = self.get_serializer_context()
+        context['preloaded'] = {
+            Project: Project.objects.select_related('owner').in_bulk(project_ids),
+            User: User.objects.in_bulk(user_ids),
+        }
+        return context
+
+    def _write_assignments(self, assignments):
+        """
+        Applies (task, old_user_ids, new_user_ids) triples straight to the
+        through table, then notifies and logs the differences in one batch
+        instead of running the m2m signals per task.
+        """
+        through = Task.assigned_to.through
+        added, removed = [], []
+        for task, old_ids, new_ids in assignments:
+            if new_ids - old_ids:
+                added.append((task, ActivityType.TASK_ASSIGNED, new_ids - old_ids))
+            if old_ids - new_ids:
+                removed.append((task, ActivityType.TASK_UNASSIGNED, old_ids - new_ids))
+
+        if removed:
+            stale = {(task.pk, user_id) for task, _, user_ids in removed for user_id in user_ids}
+            rows = through.objects.filter(
+                task_id__in={task.pk for task, _, _ in removed},
+                user_id__in={user_id for _, user_id in stale},
+            ).values_list('id', 'task_id', 'user_id')
+            through.objects.filter(id__in=[pk for pk, task_id, user_id in rows if (task_id, user_id) in stale]).delete()
+        through.objects.bulk_create([
+            through(task_id=task.pk, user_id=user_id) for task, _, user_ids in added for user_id in user_ids
+        ])
+        log_assignment_changes(added + removed)
+        invalidate_dashboards({user_id for _, _, user_ids in added + removed for user_id in user_ids})
+
+    def _bulk_create_tasks(self, items, access):
+        context = self._bulk_serializer_context(items)
+        serializers_ = [TaskSerializer(data=item, context=context) for item in items]
+        errors = {index: s.errors for index, s in enumerate(serializers_) if not s.is_valid()}
+        if errors:
+            raise ValidationError({'create': errors})
+
+        project_ids = {s.validated_data['project'].id for s in serializers_}
+        if not all(access.can_access(project_id) for project_id in project_ids):
+            raise PermissionDenied("You must be the project owner or a member of the project to create tasks.")
+
+        assignments = [s.validated_data.pop('assigned_to', None) for s in serializers_]
+        tasks = Task.objects.bulk_create([Task(**s.validated_data) for s in serializers_])
+
+        ProjectStats.record_task_changes((None, None, task.project_id, task.status) for task in tasks)
+        SearchDocument.index_tasks(tasks)
+        ActivityLog.bulk_record([
+            ActivityLog(
+                project=task.project, user=task.project.owner, task=task,
+                event_type=ActivityType.TASK_CREATED, subject=task.title,
+            )
+            for task in tasks if task.project.owner_id
+        ])
+        self._write_assignments([
+            (task, set(), {user.pk for user in users}) for task, users in zip(tasks, assignments) if users
+        ])
+        transaction.on_commit(lambda: invalidate_project_dashboards(project_ids))
+        return [task.id for task in tasks]
+
+    def _load_bulk_targets(self, key, ids, access, queryset):
+        if not all(isinstance(pk, int) for pk in ids):
+            raise ValidationError({key: "Every task needs an integer id."})
+        if len(set(ids)) != len(ids):
+            raise ValidationError({key: "Each task may appear only once."})
+        tasks = access.filter(queryset.filter(id__in=ids)).in_bulk()
+        missing = [pk for pk in ids if pk not in tasks]
+        if missing:
+            raise ValidationError({key: f"Tasks not found: {missing}"})
+        return tasks
+
+    def _bulk_update_tasks(self, items, access):
+        if not items:
+            return []
+        if not all(isinstance(item, dict) for item in items):
+            raise ValidationError({'update': "Expected a list of objects."})
+        tasks = self._load_bulk_targets(
+            'update', [item.get('id') for item in items], access,
+            Task.objects.select_related('project__owner').prefetch_related('assigned_to'),
+        )
+
+        context = self._bulk_serializer_context(items)
+        errors, changes, status_changed, assignments, fields = {}, [], [], [], {'updated_at'}
+        moved = defaultdict(list)
+        now = timezone.now()
+        for index, item in enumerate(items):
+            task = tasks[item['id']]
+            data = {key: value for key, value in item.items() if key != 'id'}
+            serializer = TaskSerializer(task, data=data, partial=True, context=context)
+            if not serializer.is_valid():
+                errors[index] = serializer.errors
+                continue
+            values = serializer.validated_data
+            users = values.pop('assigned_to', None)
+            if 'project' in values and not access.can_access(values['project'].id):
+                raise PermissionDenied("You do not have permission to move tasks into this project.")
+            # Assignment changes stay owner-only, as in update().
+            if users is not None and access.owns(task.project_id):
+                assignments.append((task, {user.pk for user in task.assigned_to.all()}, {user.pk for user in users}))
+
+            old_project_id, old_status = task.project_id, task.status
+            for attr, value in values.items():
+                setattr(task, attr, value)
+            task.updated_at = now
+            fields.update(values)
+            changes.append((old_project_id, old_status, task.project_id, task.status))
+            if task.status != old_status:
+                status_changed.append(task)
+            if task.project_id != old_project_id:
+                moved[task.project_id].append(task.id)
+        if errors:
+            raise ValidationError({'update': errors})
+
+        Task.objects.bulk_update(tasks.values(), sorted(fields))
+        ProjectStats.record_task_changes(changes)
+        SearchDocument.index_tasks(tasks.values())
+        for project_id, task_ids in moved.items():
+            SearchDocument.objects.filter(kind='comment', task_id__in=task_ids).update(project_id=project_id)
+        self._write_assignments(assignments)
+        # Completion is credited to the new assignees, so reload them.
+        reassigned = [task for task, old_ids, new_ids in assignments if old_ids != new_ids]
+        for task in reassigned:
+            task._prefetched_objects_cache.pop('assigned_to', None)
+        prefetch_related_objects(reassigned, 'assigned_to')
+        log_task_status_changes(status_changed)
+        project_ids = {pk for change in changes for pk in (change[0], change[2])}
+        transaction.on_commit(lambda: invalidate_project_dashboards(project_ids))
+        return [item['id'] for item in items]
+
+    def _bulk_delete_tasks(self, ids, access):
+        if not ids:
+            return []
+        tasks = self._load_bulk_targets('delete', ids, access, Task.objects.select_related('project'))
+        ActivityLog.bulk_record([
+            ActivityLog(
+                project=task.project, user=self.request.user, task=task,
+                event_type=ActivityType.TASK_DELETED, subject=task.title,
+            )
+            for task in tasks.values() if task.project.owner_id
+        ])
+        delete_tasks(tasks.values())
+        return list(tasks)
+
 
-class TeamMemberViewSet(viewsets.ModelViewSet):
+class TeamMemberViewSet(ConditionalListMixin, viewsets.ModelViewSet):
     serializer_class = TeamMemberSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
-        user = self.request.user
-        queryset = TeamMember.objects.filter(
-            project__in=Project.objects.filter(
-                Q(owner=user) | Q(team_members__user=user)
-            )
-        ).distinct()
+        queryset = get_project_access(self.request).filter(TeamMember.objects.all())
 
         project_id = self.request.query_params.get('project')
         if project_id:
             queryset = queryset.filter(project_id=project_id)
             
         return queryset
+
+    def get_etag_project_ids(self):
+        accessible = get_project_access(self.request).accessible
+        project_id = self.request.query_params.get('project')
+        if project_id:
+            return accessible & {int(project_id)} if project_id.isdigit() else set()
+        return accessible
     
     def perform_create(self, serializer):
         project = serializer.validated_data.get('project')
-        if project.owner != self.request.user:
-            raise permissions.PermissionDenied("Only the project owner can add team members.")
+        if not get_project_access(self.request).owns(project.id):
+            raise PermissionDenied("Only the project owner can add team members.")
         serializer.save()
 
 class ExpenseViewSet(viewsets.ModelViewSet):
@@ -290,38 +638,88 @@ class ExpenseViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        user = self.request.user
-        return Expense.objects.filter(
-            project__in=Project.objects.filter(
-                Q(owner=user) | Q(team_members__user=user)
-            )
-        ).distinct()
+        return get_project_access(self.request).filter(Expense.objects.all())
 
 class CommentViewSet(viewsets.ModelViewSet):
     serializer_class = CommentSerializer
     permission_classes = [IsAuthenticated]
-    queryset = Comment.objects.all()
+    pagination_class = CommentCursorPagination
+
+    def get_queryset(self):
+        queryset = get_project_access(self.request).filter(
+            Comment.objects.all(), field='task__project_id'
+        ).select_related('author__profile')
+
+        task_id = self.request.query_params.get('task')
+        if task_id:
+            if not task_id.isdigit():
+                raise ValidationError({"task": "Expected a task ID."})
+            queryset = queryset.filter(task_id=task_id)
+        return queryset
 
     def perform_create(self, serializer):
+        if not get_project_access(self.request).can_access(serializer.validated_data['task'].project_id):
+            raise PermissionDenied("You do not have permission to comment on this task.")
         serializer.save(author=self.request.user)
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
-    
+    pagination_class = NotificationCursorPagination
+
     def get_queryset(self):
-        return Notification.objects.filter(user=self.request.user).order_by('-created_at')
+        return Notification.objects.filter(user=self.request.user).order_by('-created_at', '-id')
+
+    def _unread_count(self, user):
+        count = Profile.objects.filter(user=user).values_list('unread_notifications', flat=True).first()
+        if count is None:
+            # Users created before profiles were automatic have no counter.
+            count = Notification.objects.filter(user=user, is_read=False).count()
+        return count
+
+    @action(detail=False, methods=['get'], url_path='unread-count')
+    def unread_count(self, request):
+        return Response({"unread": self._unread_count(request.user)})
+
+    @action(detail=False, methods=['post'], url_path='mark-read')
+    def mark_read(self, request):
+        """
+        Marks notifications read with one UPDATE: ids in [from_id, to_id], or
+        everything created up to ``before``, or the whole inbox if neither.
+        """
+        if not isinstance(request.data, dict):
+            raise ValidationError("Expected an object with from_id/to_id or before.")
+        queryset = Notification.objects.filter(user=request.user, is_read=False)
+        bounds = {}
+        for key, lookup in (('from_id', 'id__gte'), ('to_id', 'id__lte')):
+            value = request.data.get(key)
+            if value is None:
+                continue
+            if isinstance(value, bool) or not str(value).isdigit():
+                raise ValidationError({key: "Expected a positive integer."})
+            bounds[lookup] = int(value)
+        before = request.data.get('before')
+        if before is not None:
+            parsed = parse_datetime(str(before))
+            if parsed is None:
+                raise ValidationError({"before": "Expected an ISO 8601 timestamp."})
+            if timezone.is_naive(parsed):
+                parsed = timezone.make_aware(parsed)
+            bounds['created_at__lte'] = parsed
+
+        with transaction.atomic():
+            marked = queryset.filter(**bounds).update(is_read=True)
+            Profile.bump_unread({request.user.id: -marked})
+        return Response({"marked": marked, "unread": self._unread_count(request.user)})
 
 class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = ActivityLogSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = ActivityLogCursorPagination
     
     def get_queryset(self):
-        user = self.request.user
-        return ActivityLog.objects.filter(
-            Q(project__owner=user) | 
-            Q(project__team_members__user=user)
-        ).distinct().order_by('-timestamp')
+        # Reads through the live + archive view, so archiving does not shorten the feed.
+        return get_project_access(self.request).filter(ActivityFeed.objects.all()).select_related('user', 'target_user', 'project', 'task')
 
 # ---------------------------------------------------------
 # EXTRA VIEWS
@@ -333,34 +731,215 @@ class AttachmentListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def perform_create(self, serializer):
-        serializer.save(uploaded_by=self.request.user)
+        if not get_project_access(self.request).can_access(serializer.validated_data['task'].project_id):
+            raise PermissionDenied("You do not have permission to upload files to this task.")
+        upload = serializer.validated_data.pop('file')
+        with transaction.atomic():
+            blob = AttachmentBlob.objects.store(upload, upload.name)
+            serializer.save(uploaded_by=self.request.user, blob=blob, file=blob.file.name, filename=upload.name)
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = get_project_access(self.request).filter(
+            super().get_queryset(), field='task__project_id'
+        ).select_related('uploaded_by', 'blob')
         task_id = self.request.query_params.get('task')
         if task_id:
             queryset = queryset.filter(task_id=task_id)
         return queryset
 
+# ---------------------------------------------------------
+# CHUNKED UPLOADS
+# ---------------------------------------------------------
+class UploadSessionFile(File):
+    """Lets file storage move the assembled temp file into place instead of copying it."""
+
+    def temporary_file_path(self):
+        return self.name
+
+class UploadSessionCreateView(generics.CreateAPIView):
+    """Starts a chunked upload for a task the user can access."""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def perform_create(self, serializer):
+        task = serializer.validated_data['task']
+        if not get_project_access(self.request).can_access(task.project_id):
+            raise PermissionDenied("You do not have permission to upload files to this task.")
+        session = serializer.save(uploaded_by=self.request.user)
+        os.makedirs(os.path.dirname(session.temp_path), exist_ok=True)
+        open(session.temp_path, 'wb').close()
+
+class UploadSessionView(APIView):
+    """
+    GET reports how many bytes have been committed, PUT appends the raw
+    request body at the ``Upload-Offset`` header, DELETE abandons the upload.
+    """
+    permission_classes = [IsAuthenticated]
+    READ_SIZE = 64 * 1024
+    MAX_CHUNK_SIZE = 16 * 1024 * 1024
+
+    def get_session(self, request, pk):
+        return get_object_or_404(UploadSession, pk=pk, uploaded_by=request.user)
+
+    def get(self, request, pk):
+        return Response(UploadSessionSerializer(self.get_session(request, pk)).data)
+
+    def put(self, request, pk):
+        session = self.get_session(request, pk)
+        try:
+            offset = int(request.headers['Upload-Offset'])
+            length = int(request.headers['Content-Length'])
+        except (KeyError, ValueError):
+            raise ValidationError("Upload-Offset and Content-Length headers are required.")
+        if offset != session.received:
+            return Response({'received': session.received}, status=status.HTTP_409_CONFLICT)
+        if length > self.MAX_CHUNK_SIZE or offset + length > session.size:
+            raise ValidationError(f"Chunks may be at most {self.MAX_CHUNK_SIZE} bytes and must not pass the declared size.")
+
+        # The body is copied to disk in small reads and never held in memory.
+        written = 0
+        try:
+            with open(session.temp_path, 'r+b') as fh:
+                fh.seek(offset)
+                fh.truncate()
+                while written < length:
+                    data = request.stream.read(min(self.READ_SIZE, length - written))
+                    if not data:
+                        break
+                    fh.write(data)
+                    written += len(data)
+        finally:
+            # Commit whatever arrived, so an interrupted chunk resumes from
+            # there. The offset guard keeps a racing append from counting twice.
+            UploadSession.objects.filter(pk=session.pk, received=offset).update(
+                received=offset + written, updated_at=timezone.now()
+            )
+        return Response({'received': offset + written})
+
+    def delete(self, request, pk):
+        self.get_session(request, pk).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class UploadSessionFinalizeView(UploadSessionView):
+    """Turns a fully received upload into an Attachment."""
+    http_method_names = ['post', 'options']
+
+    def post(self, request, pk):
+        session = self.get_session(request, pk)
+        if session.received != session.size:
+            return Response({'received': session.received}, status=status.HTTP_409_CONFLICT)
+
+        with transaction.atomic():
+            with open(session.temp_path, 'rb') as fh:
+                blob = AttachmentBlob.objects.store(UploadSessionFile(fh), session.filename)
+            attachment = Attachment.objects.create(
+                task=session.task, uploaded_by=request.user,
+                blob=blob, file=blob.file.name, filename=session.filename,
+            )
+            session.delete()
+        return Response(
+            AttachmentSerializer(attachment, context={'request': request}).data,
+            status=status.HTTP_201_CREATED,
+        )
+
+class SearchView(APIView):
+    """
+    Ranked full-text search over the projects, tasks and comments the user
+    can access. ``q`` matches whole words, with the last one as a prefix.
+    """
+    permission_classes = [IsAuthenticated]
+    DEFAULT_LIMIT = 20
+    MAX_LIMIT = 50
+    SNIPPET_LENGTH = 160
+
+    def get(self, request):
+        query = request.query_params.get('q', '').strip()
+        if len(query) < 2:
+            raise ValidationError({"q": "Enter at least 2 characters."})
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', self.DEFAULT_LIMIT)), self.MAX_LIMIT))
+        except ValueError:
+            limit = self.DEFAULT_LIMIT
+
+        documents = search_documents(query, get_project_access(request).accessible, limit)
+        return Response([
+            {
+                'type': document.kind,
+                'id': document.object_id,
+                'project': document.project_id,
+                'task': document.task_id,
+                'title': document.title,
+                'snippet': document.body[:self.SNIPPET_LENGTH],
+            }
+            for document in documents
+        ])
+
+# ---------------------------------------------------------
+# ATTACHMENT DOWNLOADS
+# ---------------------------------------------------------
+class AttachmentDownloadView(APIView):
+    """
+    Checks project membership and hands out a short-lived signed URL for the
+    file, or redirects to it with ``?redirect=1``.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        attachment = get_object_or_404(Attachment.objects.select_related('task', 'blob'), pk=pk)
+        if not get_project_access(request).can_access(attachment.task.project_id):
+            raise PermissionDenied("You do not have permission to download this file.")
+        url = request.build_absolute_uri(attachment_download_url(attachment))
+        if request.query_params.get('redirect'):
+            return HttpResponseRedirect(url)
+        return Response({'url': url, 'expires_in': settings.ATTACHMENT_URL_TTL})
+
+def signed_media(request, name):
+    """
+    Serves attachment files behind a signed URL. The signature is checked
+    without touching the database; blob files never change, so they are
+    also cacheable for as long as the URL is valid.
+    """
+    signed = verify_signed_request(name, request.GET)
+    if signed is None:
+        return HttpResponseForbidden("Invalid or expired download link.")
+    filename, content_type = signed
+    if name.startswith('blobs/'):
+        etag = f'"{os.path.basename(name)}"'
+        cache_control = f'private, max-age={settings.ATTACHMENT_URL_TTL}, immutable'
+    else:
+        etag = f'"{hashlib.sha1(name.encode()).hexdigest()}"'
+        cache_control = 'private, no-cache'
+    if not default_storage.exists(name):
+        raise Http404
+    return serve_file(request, name, filename, content_type, etag, cache_control)
+
 class DashboardStatsView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        cache_key = get_dashboard_cache_key(request.user.id)
+        data = cache.get(cache_key)
+        if data is None:
+            data = self._build_stats(request)
+            cache.set(cache_key, data, DASHBOARD_SNAPSHOT_TIMEOUT)
+        return Response(data)
+
+    def _build_stats(self, request):
         user = request.user
-        
-        projects = Project.objects.filter(
-            Q(owner=user) | Q(team_members__user=user)
-        ).distinct()
-        
-        tasks = Task.objects.filter(assigned_to=user)
-        
-        total_projects = projects.count()
-        active_projects = projects.filter(status='In Progress').count()
-        total_tasks = tasks.count()
-        pending_tasks = tasks.filter(status__in=['To Do', 'In Progress']).count()
-        completed_tasks = tasks.filter(status='Done').count()
-        
-        recent_projects = projects.order_by('-start_date')[:5]
+        projects = get_project_access(request).filter(Project.objects.all(), field='id')
+
+        project_counts = projects.aggregate(
+            total_projects=Count('id'),
+            active_projects=Count('id', filter=Q(status='In Progress')),
+            total_expenses=Sum('stats__expense_total'),
+        )
+        task_counts = Task.objects.filter(assigned_to=user).aggregate(
+            total_tasks=Count('id'),
+            pending_tasks=Count('id', filter=Q(status__in=['To Do', 'In Progress'])),
+            completed_tasks=Count('id', filter=Q(status='Done')),
+        )
+
+        recent_projects = projects.select_related('stats').order_by('-start_date')[:5]
         
         recent_projects_data = [
             {
@@ -368,15 +947,210 @@ class DashboardStatsView(APIView):
                 "title": p.title,
                 "status": p.status,
                 "priority": p.priority,
-                "end_date": p.end_date
+                "end_date": p.end_date,
+                "progress": self._progress(p),
             } for p in recent_projects
         ]
 
-        return Response({
-            "total_projects": total_projects,
-            "active_projects": active_projects,
-            "total_tasks": total_tasks,
-            "pending_tasks": pending_tasks,
-            "completed_tasks": completed_tasks,
+        return {
+            "total_projects": project_counts['total_projects'],
+            "active_projects": project_counts['active_projects'],
+            "total_tasks": task_counts['total_tasks'],
+            "pending_tasks": task_counts['pending_tasks'],
+            "completed_tasks": task_counts['completed_tasks'],
+            "total_expenses": project_counts['total_expenses'] or 0,
             "recent_projects": recent_projects_data
-        })
\ No newline at end of file
+        }
+
+    def _progress(self, project):
+        try:
+            stats = project.stats
+        except ProjectStats.DoesNotExist:
+            return 0
+        if stats.total_tasks == 0:
+            return 0
+        return round((stats.done_tasks / stats.total_tasks) * 100)
+
+
+class AnalyticsView(APIView):
+    """
+    Aggregates for the analytics page, computed in the database so the
+    response size does not grow with the account.
+
+    Optional ``start``/``end`` (YYYY-MM-DD) bound the daily activity series,
+    which defaults to the last 7 days, and restrict expenses to that range.
+    The series is read from ActivityRollup, so it covers archived activity.
+    """
+    permission_classes = [IsAuthenticated]
+    MAX_RANGE_DAYS = 366
+
+    def get(self, request):
+        access = get_project_access(request)
+        start, end, expense_range = self._get_range(request)
+
+        expenses = access.filter(Expense.objects.all())
+        if expense_range:
+            expenses = expenses.filter(date__range=(start, end))
+        expenses_by_category = list(
+            expenses.values('category').annotate(total=Sum('amount')).order_by('-total')
+        )
+
+        daily = {
+            row['day']: row
+            for row in access.filter(ActivityRollup.objects.all()).filter(
+                day__range=(start, end),
+            ).values('day').annotate(
+                total=Sum('count'),
+                completed=Sum('count', filter=Q(action_type=ActivityType.TASK_COMPLETED)),
+            ).order_by('day')
+        }
+        activity_by_day = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            row = daily.get(day, {})
+            activity_by_day.append({
+                "date": day,
+                "total": row.get('total') or 0,
+                "completed": row.get('completed') or 0,
+            })
+
+        task_counts = access.filter(Task.objects.all()).aggregate(
+            done=Count('id', filter=Q(status='Done')),
+            pending=Count('id', filter=~Q(status='Done')),
+        )
+
+        return Response({
+            "start": start,
+            "end": end,
+            "expense_total": sum((row['total'] for row in expenses_by_category), 0),
+            "expenses_by_category": expenses_by_category,
+            "activity_by_day": activity_by_day,
+            "tasks": task_counts,
+        })
+
+    def _get_range(self, request):
+        start = self._parse_date_param(request, 'start')
+        end = self._parse_date_param(request, 'end')
+        expense_range = bool(start or end)
+
+        end = end or timezone.now().date()
+        start = start or end - timedelta(days=6)
+        if start > end:
+            raise ValidationError({"start": "start must not be after end."})
+        if (end - start).days >= self.MAX_RANGE_DAYS:
+            raise ValidationError({"start": f"The range may span at most {self.MAX_RANGE_DAYS} days."})
+        return start, end, expense_range
+
+    def _parse_date_param(self, request, name):
+        value = request.query_params.get(name)
+        if not value:
+            return None
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            raise ValidationError({name: "Enter a date in YYYY-MM-DD format."})
+        return parsed
+
+
+# ---------------------------------------------------------
+# REAL-TIME STREAMS
+# ---------------------------------------------------------
+
+NOTIFICATION_STREAM_KEEPALIVE = 15
+NOTIFICATION_STREAM_BACKLOG = 100
+
+
+def _authenticate_stream_request(request):
+    """
+    Resolves the JWT user for a stream. EventSource cannot send headers, so
+    the access token may also be passed as ``?token=``.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get('token')
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+def _notifications_after(user_id, last_id):
+    return list(
+        Notification.objects.filter(user_id=user_id, id__gt=last_id)
+        .order_by('id')[:NOTIFICATION_STREAM_BACKLOG]
+    )
+
+
+def _latest_notification_id(user_id):
+    return Notification.objects.filter(user_id=user_id).aggregate(latest=models.Max('id'))['latest'] or 0
+
+
+async def _notification_events(user_id, last_id):
+    loop, queue = notification_broker.subscribe(user_id)
+    try:
+        # Fix the starting point before the first yield, so nothing created
+        # between the request and the first read is skipped.
+        if last_id is None:
+            last_id = await sync_to_async(_latest_notification_id)(user_id)
+            pending = []
+        else:
+            # Resuming: replay whatever was created while disconnected.
+            pending = await sync_to_async(_notifications_after)(user_id, last_id)
+        yield f"retry: {NOTIFICATION_STREAM_KEEPALIVE * 1000}\n\n"
+
+        while True:
+            for notification in pending:
+                last_id = notification.id
+                data = json.dumps(NotificationSerializer(notification).data, cls=DjangoJSONEncoder)
+                yield f"id: {notification.id}\nevent: notification\ndata: {data}\n\n"
+            if len(pending) == NOTIFICATION_STREAM_BACKLOG:
+                # More are waiting behind a full page.
+                pending = await sync_to_async(_notifications_after)(user_id, last_id)
+                continue
+
+            # The broker only wakes the stream early. What is sent always
+            # comes from the database, so notifications written by other
+            # worker processes, or dropped from a full queue, are not skipped.
+            woken = True
+            try:
+                await asyncio.wait_for(queue.get(), NOTIFICATION_STREAM_KEEPALIVE)
+            except asyncio.TimeoutError:
+                woken = False
+            while not queue.empty():
+                queue.get_nowait()
+            pending = await sync_to_async(_notifications_after)(user_id, last_id)
+            if not pending and not woken:
+                yield ": keep-alive\n\n"
+    finally:
+        notification_broker.unsubscribe(user_id, (loop, queue))
+
+
+async def notification_stream(request):
+    """
+    Server-Sent Events stream of the user's new notifications. Reconnecting
+    clients resume after the ``Last-Event-ID`` they last received.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    user = await sync_to_async(_authenticate_stream_request)(request)
+    if user is None:
+        return JsonResponse({"detail": "Authentication credentials were not provided or are invalid."}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return JsonResponse({"detail": "Last-Event-ID must be a notification id."}, status=400)
+
+    response = StreamingHttpResponse(
+        _notification_events(user.id, last_id),
+        content_type='text/event-stream',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -100,15 +100,38 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 #     }
 # }
 
+# Persistent connections are kept per thread, and under ASGI (see Procfile)
+# sync code runs on short-lived per-request threads, so a CONN_MAX_AGE above
+# 0 leaks a connection per request. At 0 each connection is closed when its
+# request finishes (for notification streams, when the client disconnects).
+# Put a pooler such as PgBouncer in front of the database instead.
 DATABASES = {
     'default': dj_database_url.parse(
         config('DATABASE_URL', default='sqlite:///' + str(BASE_DIR / 'db.sqlite3')),
-        conn_max_age=600,
+        conn_max_age=config('CONN_MAX_AGE', default=0, cast=int),
         conn_health_checks=True,
     )
 }
 
 
+# =================================================
+# CACHE
+# =================================================
+
+# Dashboard snapshots are invalidated from model signals, so every worker
+# must share one cache. Point CACHE_BACKEND/CACHE_LOCATION at Redis or
+# Memcached in production; the in-process default only suits a single worker.
+# Project access indexes are cached here too, but each entry is checked
+# against Profile.access_version in the database, so a per-process cache can
+# cost extra rebuilds yet never serves revoked access.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='goproject'),
+    }
+}
+
+
 # =================================================
 # AUTHENTICATION & PASSWORDS
 # =================================================
@@ -193,6 +216,32 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Largest attachment accepted through the chunked upload endpoints.
+MAX_ATTACHMENT_SIZE = config('MAX_ATTACHMENT_SIZE', default=2 * 1024 ** 3, cast=int)
+
+# Profile picture and image attachment thumbnails: output format (WEBP or
+# JPEG) and the largest source, in pixels, that will be decoded.
+THUMBNAIL_FORMAT = config('THUMBNAIL_FORMAT', default='WEBP')
+THUMBNAIL_MAX_PIXELS = config('THUMBNAIL_MAX_PIXELS', default=40_000_000, cast=int)
+
+# prune_notifications: read notifications older than this many days are
+# removed, and every removed row is appended to gzipped JSONL files here.
+NOTIFICATION_RETENTION_DAYS = config('NOTIFICATION_RETENTION_DAYS', default=90, cast=int)
+NOTIFICATION_ARCHIVE_DIR = config('NOTIFICATION_ARCHIVE_DIR', default=str(BASE_DIR / 'archive' / 'notifications'))
+
+# archive_activity moves activity logs older than this many days out of the
+# live table; feeds still show them and charts read the daily rollup.
+ACTIVITY_ARCHIVE_DAYS = config('ACTIVITY_ARCHIVE_DAYS', default=180, cast=int)
+
+# Lifetime in seconds of signed attachment download URLs.
+ATTACHMENT_URL_TTL = config('ATTACHMENT_URL_TTL', default=300, cast=int)
+
+# Hands attachment transfers to the front proxy: '' streams from Django,
+# 'nginx' uses X-Accel-Redirect to SENDFILE_URL_PREFIX (an internal location
+# aliased to MEDIA_ROOT), 'sendfile' uses X-Sendfile (Apache, lighttpd).
+SENDFILE_BACKEND = config('SENDFILE_BACKEND', default='')
+SENDFILE_URL_PREFIX = config('SENDFILE_URL_PREFIX', default='/protected-media/')
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # =================================================
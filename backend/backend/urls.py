@@ -1,5 +1,5 @@
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -7,12 +7,20 @@ from rest_framework_simplejwt.views import (
 from django.conf import settings
 from django.conf.urls.static import static
 
+from api.views import signed_media
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+
+    # Attachment files, served only behind signed URLs.
+    re_path(
+        rf'^{settings.MEDIA_URL.lstrip("/")}(?P<name>(?:blobs|attachments)/.+)$',
+        signed_media, name='signed-media',
+    ),
 ]
 
 if settings.DEBUG:
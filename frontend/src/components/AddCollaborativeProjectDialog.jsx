@@ -29,25 +29,26 @@ export function AddCollaborativeProjectDialog({
   const [loading, setLoading] = useState(false);
   const [search, setSearch] = useState("");
 
-const filteredUsers = users.filter((u) =>
-  u.username.toLowerCase().includes(search.toLowerCase())
-);
-
   useEffect(() => {
-    if (open && !initialData) { 
-      async function fetchUsers() {
-        try {
-          const res = await api.get("/api/users/");
-          setUsers(res.data);
-        } catch (err) {
-          console.error("Failed to fetch users", err);
-        }
-      }
-      fetchUsers();
-    } else if (!open) {
-        setUsers([]);
+    if (!open || initialData) {
+      setUsers([]);
+      return;
     }
-  }, [open, initialData]); 
+    const query = search.trim();
+    if (!query) {
+      setUsers([]);
+      return;
+    }
+    const timeout = setTimeout(async () => {
+      try {
+        const res = await api.get("/api/users/search/", { params: { q: query } });
+        setUsers(res.data);
+      } catch (err) {
+        console.error("Failed to search users", err);
+      }
+    }, 250);
+    return () => clearTimeout(timeout);
+  }, [open, initialData, search]); 
 
 useEffect(() => {
     if (initialData) {
@@ -190,9 +191,11 @@ useEffect(() => {
                         onChange={(e) => setSearch(e.target.value)}
                       />
                   {users.length === 0 ? (
-                    <p className="text-xs text-gray-500 text-center mt-4">No other users found.</p>
+                    <p className="text-xs text-gray-500 text-center mt-4">
+                      {search.trim() ? "No other users found." : "Type a username or email to search."}
+                    </p>
                   ) : (
-                    filteredUsers.map((user) => ( 
+                    users.map((user) => ( 
                       <div key={user.id} className="flex items-center space-x-2">
                         <input
                           type="checkbox"
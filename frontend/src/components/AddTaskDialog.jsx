@@ -59,7 +59,7 @@ export function AddTaskDialog({ open, onOpenChange, projectId, onTaskSaved, task
                     title,
                     priority,
                     due_date: dueDate || null,
-                });
+                }, { params: { expand: "attachments" } });
             } else {
                 res = await api.post("/api/tasks/", {
                     title,
@@ -21,6 +21,36 @@ import {
 } from "@/components/ui/table";
 import api from "../api"; 
 
+const UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024;
+const UPLOAD_RETRIES = 3;
+
+// Sends the file in chunks and resumes from the server's offset after a failure.
+const uploadInChunks = async (file, taskId) => {
+  const { data: session } = await api.post("/api/attachments/uploads/", {
+    task: taskId,
+    filename: file.name,
+    size: file.size,
+  });
+  const url = `/api/attachments/uploads/${session.id}/`;
+  let offset = 0;
+  let failures = 0;
+
+  while (offset < file.size) {
+    try {
+      const res = await api.put(url, file.slice(offset, offset + UPLOAD_CHUNK_SIZE), {
+        headers: { "Content-Type": "application/offset+octet-stream", "Upload-Offset": offset },
+      });
+      offset = res.data.received;
+      failures = 0;
+    } catch (error) {
+      if (++failures > UPLOAD_RETRIES) throw error;
+      const res = await api.get(url);
+      offset = res.data.received;
+    }
+  }
+  return api.post(`${url}finalize/`);
+};
+
 const TaskBoard = ({ tasks, onUpdateTask, onDeleteTask, onEditTask, onSuccess }) => {
   
   const getStatusColor = (status) => {
@@ -60,12 +90,8 @@ const TaskBoard = ({ tasks, onUpdateTask, onDeleteTask, onEditTask, onSuccess })
     const file = e.target.files[0];
     if (!file) return;
 
-    const formData = new FormData();
-    formData.append('file', file);
-    formData.append('task', task.id);
-
     try {
-      await api.post('/api/attachments/', formData);
+      await uploadInChunks(file, task.id);
       onUpdateTask(task.id, { status: 'Done' });
       
       if (onSuccess) {
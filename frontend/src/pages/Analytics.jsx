@@ -4,7 +4,7 @@ import {
   CartesianGrid, Tooltip, Legend, ResponsiveContainer 
 } from 'recharts';
 import { TrendingUp, PhilippinePeso, CheckCircle2, AlertCircle } from 'lucide-react';
-import { format, subDays, isSameDay, parseISO } from 'date-fns';
+import { format, parseISO } from 'date-fns';
 import api from '../api';
 import EmptyContainer from '../components/EmptyContainer';
 
@@ -13,9 +13,7 @@ import EmptyContainer from '../components/EmptyContainer';
 
 
 const Analytics = () => {
-  const [expenses, setExpenses] = useState([]);
-  const [logs, setLogs] = useState([]);
-  const [tasks, setTasks] = useState([]);
+  const [analytics, setAnalytics] = useState(null);
   const [loading, setLoading] = useState(true);
 
   const COLORS = ['#0088FE', '#00C49F', '#FFBB28', '#FF8042', '#8884d8'];
@@ -23,14 +21,8 @@ const Analytics = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [expRes, logRes, taskRes] = await Promise.all([
-          api.get('/api/expenses/'),
-          api.get('/api/activity-logs/'),
-          api.get('/api/tasks/')
-        ]);
-        setExpenses(expRes.data);
-        setLogs(logRes.data);
-        setTasks(taskRes.data);
+        const res = await api.get('/api/analytics/');
+        setAnalytics(res.data);
       } catch (error) {
         console.error("Error fetching analytics:", error);
       } finally {
@@ -40,40 +32,20 @@ const Analytics = () => {
     fetchData();
   }, []);
 
-  const expenseData = expenses.reduce((acc, curr) => {
-    const found = acc.find(item => item.name === curr.category);
-    if (found) {
-      found.value += parseFloat(curr.amount);
-    } else {
-      acc.push({ name: curr.category, value: parseFloat(curr.amount) });
-    }
-    return acc;
-  }, []);
+  const expenseData = (analytics?.expenses_by_category || []).map(item => ({
+    name: item.category,
+    value: parseFloat(item.total)
+  }));
 
-  const getLast7Days = () => {
-    const days = [];
-    for (let i = 6; i >= 0; i--) {
-      days.push(subDays(new Date(), i));
-    }
-    return days;
-  };
-
-  const activityData = getLast7Days().map(day => {
-    const count = logs.filter(log => {
-        const logDate = parseISO(log.timestamp);
-        return isSameDay(logDate, day) && log.action.toLowerCase().includes('completed');
-    }).length;
-
-    return {
-      date: format(day, 'MMM dd'), 
-      completed: count
-    };
-  });
+  const activityData = (analytics?.activity_by_day || []).map(day => ({
+    date: format(parseISO(day.date), 'MMM dd'),
+    completed: day.completed
+  }));
 
   // --- 3. QUICK STATS ---
-  const totalSpent = expenses.reduce((sum, item) => sum + parseFloat(item.amount), 0);
-  const completedTaskCount = tasks.filter(t => t.status === 'Done').length;
-  const pendingTaskCount = tasks.filter(t => t.status !== 'Done').length;
+  const totalSpent = parseFloat(analytics?.expense_total || 0);
+  const completedTaskCount = analytics?.tasks?.done || 0;
+  const pendingTaskCount = analytics?.tasks?.pending || 0;
 
   if (loading) return <div className="p-10 text-center text-gray-500">Loading Analytics...</div>;
 
@@ -18,7 +18,7 @@ const Home = () => {
 
     const [personalProjects, setPersonalProjects] = useState([]);
     const [collabProjects, setCollabProjects] = useState([]);
-    const [expenses, setExpenses] = useState([]);
+    const [totalExpenses, setTotalExpenses] = useState(0);
     const [recentActivity, setRecentActivity] = useState([]);
 
     const [profileData, setProfileData] = useState({
@@ -73,10 +73,10 @@ const Home = () => {
             setCollabProjects(collabRes.data);
 
             const activityRes = await api.get("/api/activity-logs/");
-            setRecentActivity(activityRes.data);
+            setRecentActivity(activityRes.data.results);
 
-            const expRes = await api.get("/api/expenses/");
-            setExpenses(expRes.data);
+            const statsRes = await api.get("/api/dashboard-stats/");
+            setTotalExpenses(Number(statsRes.data.total_expenses || 0));
 
         } catch (error) {
             console.error("Error fetching dashboard data:", error);
@@ -100,9 +100,6 @@ const Home = () => {
 
     const totalPersonal = personalProjects.length;
     const totalCollaborative = collabProjects.length;
-    const totalExpenses = Array.isArray(expenses) 
-        ? expenses.reduce((sum, e) => sum + Number(e.amount || 0), 0) 
-        : 0;
 
     return (
         <div className="w-full space-y-6">
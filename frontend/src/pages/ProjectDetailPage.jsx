@@ -1,4 +1,4 @@
-import React, { useState, useEffect, useCallback } from "react";
+import React, { useState, useEffect, useCallback, useRef } from "react";
 import { useParams, useNavigate, useOutletContext } from "react-router-dom"; 
 import api from "../api";
 
@@ -62,7 +62,7 @@ const ProjectDetailPage = () => {
       const projRes = await api.get(`/api/projects/${id}/`);
       setProject(projRes.data);
 
-      const tasksRes = await api.get(`/api/tasks/?project=${id}`); 
+      const tasksRes = await api.get(`/api/tasks/?project=${id}&expand=attachments`); 
       setTasks(tasksRes.data);
 
       if (projRes.data.project_type === 'Collaborative') {
@@ -119,15 +119,42 @@ const ProjectDetailPage = () => {
     }
   };
 
-  const handleUpdateTask = async (taskId, updatedFields) => {
+  // Quick board edits are queued and sent together through /api/tasks/bulk/.
+  const pendingUpdates = useRef({});
+  const flushTimeout = useRef(null);
+  const isMounted = useRef(true);
+
+  const flushTaskUpdates = useCallback(async () => {
+    const update = Object.entries(pendingUpdates.current).map(([taskId, fields]) => ({ id: Number(taskId), ...fields }));
+    pendingUpdates.current = {};
+    if (update.length === 0) return;
     try {
-        setTasks(prev => prev.map(t => t.id === taskId ? { ...t, ...updatedFields } : t));
-        await api.patch(`/api/tasks/${taskId}/`, updatedFields);
-        fetchProjectData(); 
+        await api.post("/api/tasks/bulk/", { update });
     } catch (error) {
-        console.error("Failed to update task", error);
-        fetchProjectData(); 
+        console.error("Failed to update tasks", error);
     }
+    if (isMounted.current) fetchProjectData();
+  }, [fetchProjectData]);
+
+  // The unmount cleanup reads the latest flush from here, so it runs once
+  // instead of whenever fetchProjectData changes identity.
+  const flushRef = useRef(flushTaskUpdates);
+  flushRef.current = flushTaskUpdates;
+
+  useEffect(() => {
+    isMounted.current = true;
+    return () => {
+      isMounted.current = false;
+      clearTimeout(flushTimeout.current);
+      flushRef.current();
+    };
+  }, []);
+
+  const handleUpdateTask = (taskId, updatedFields) => {
+    setTasks(prev => prev.map(t => t.id === taskId ? { ...t, ...updatedFields } : t));
+    pendingUpdates.current[taskId] = { ...pendingUpdates.current[taskId], ...updatedFields };
+    clearTimeout(flushTimeout.current);
+    flushTimeout.current = setTimeout(flushTaskUpdates, 400);
   };
 
   const initiateDelete = (taskId) => {